@@ -0,0 +1,41 @@
+""" Compares payload size and encode/decode time of JSON and binary codecs
+on a page of the wide model. Render time includes serialization, as binary
+codecs get datetimes unconverted.
+
+Run from the project root:
+
+    python3 -m benchmarks.codecs
+"""
+import timeit
+from rest_utils.codecs import codecs, get_codec
+from rest_utils.validator import ModelSerializer
+from benchmarks.serializer import build_wide_model, build_row
+
+ROWS = 1000
+
+
+def bench():
+    model = build_wide_model()
+    rows = [build_row(model)] * ROWS
+    for name in codecs:
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print('{:<10} not installed'.format(name))
+            continue
+        serializer = ModelSerializer(model, native=codec.native_datetime)
+        serializer.precompile()
+        page = {'items': serializer.serialize_many(rows)}
+        body = codec.dumps(page)
+        encode = min(timeit.repeat(lambda: codec.dumps(page), number=1, repeat=5))
+        render = min(timeit.repeat(
+            lambda: codec.dumps({'items': serializer.serialize_many(rows)}),
+            number=1, repeat=5))
+        decode = min(timeit.repeat(lambda: codec.loads(body), number=1, repeat=5))
+        print('{:<10} size: {:8d} bytes  encode: {:8.2f} ms  render: {:8.2f} ms  '
+              'decode: {:8.2f} ms'.format(name, len(body), encode * 1000,
+                                          render * 1000, decode * 1000))
+
+
+if __name__ == "__main__":
+    bench()
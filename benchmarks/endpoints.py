@@ -0,0 +1,141 @@
+""" Times get, list, create and update handlers of ModelResource on the wide
+model without database: query methods return synthetic rows, everything
+else (validation, serialization, encoding, response) runs as in production.
+Response bodies of get and list are expected to be encoded exactly once,
+create and update answer with Location only and encode nothing.
+Binary codecs are negotiated with Accept and Content-Type headers.
+
+Run from the project root:
+
+    python3 -m benchmarks.endpoints
+"""
+import asyncio
+import time
+from aiohttp.multidict import CIMultiDict, MultiDict
+from aiohttp.web import Application
+from sqlalchemy.dialects import postgresql
+from rest_utils.codecs import codecs, get_codec
+from rest_utils.resource import ModelResource
+from benchmarks.serializer import build_wide_model, build_row
+
+ROUNDS = 1000
+PAGE_SIZE = 100
+
+
+class CountingCodec:
+    """ Codec proxy counting dumps calls
+    """
+
+    def __init__(self, codec):
+        self._codec = codec
+        self.encodes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._codec, name)
+
+    def dumps(self, obj):
+        self.encodes += 1
+        return self._codec.dumps(obj)
+
+
+class Engine:
+    dialect = postgresql.dialect()
+
+
+class Request(dict):
+    """ The part of aiohttp Request used by model resource handlers
+    """
+
+    def __init__(self, app, method, ident=None, query=None, body=b'', headers=None):
+        super().__init__()
+        self.app = app
+        self.method = method
+        self.match_info = {'ident': ident} if ident is not None else {}
+        self.GET = MultiDict(query or {})
+        self.headers = CIMultiDict(headers or {})
+        self.scheme = 'http'
+        self.host = 'localhost'
+        self._body = body
+
+    @asyncio.coroutine
+    def read(self):
+        return self._body
+
+
+def build_resource(app, model, row):
+    class WideResource(ModelResource):
+        page_size = PAGE_SIZE
+
+        def get_path(self):
+            return '/wide'
+
+        @asyncio.coroutine
+        def get_instance(self, request, ident, fields=None):
+            return row
+
+        @asyncio.coroutine
+        def fetch_all(self, request, query):
+            return [row] * (PAGE_SIZE + 1)
+
+        @asyncio.coroutine
+        def perform_create_returning(self, request, data):
+            return row
+
+        @asyncio.coroutine
+        def perform_update_returning(self, request, id_, data, version=None):
+            return row
+
+    WideResource.model = model
+    resource = WideResource(app)
+    resource.register()
+    return resource
+
+
+def bench_endpoint(loop, codec, handler, request):
+    @asyncio.coroutine
+    def run():
+        for _ in range(ROUNDS):
+            yield from handler(request)
+
+    codec.encodes = 0
+    started = time.perf_counter()
+    loop.run_until_complete(run())
+    elapsed = time.perf_counter() - started
+    return elapsed / ROUNDS, codec.encodes / ROUNDS
+
+
+def bench():
+    loop = asyncio.get_event_loop()
+    model = build_wide_model()
+    row = build_row(model)
+    for name in codecs:
+        try:
+            codec = CountingCodec(get_codec(name))
+        except ImportError:
+            print('{:<10} not installed'.format(name))
+            continue
+        app = Application(loop=loop)
+        app['db_engine'] = Engine()
+        if codec.media_type == 'application/json':
+            app['json_codec'] = codec
+        else:  # negotiated as in production, JSON stays the default codec
+            app['render_codecs'] = [codec]
+        headers = {'Accept': codec.media_type, 'Content-Type': codec.media_type}
+        resource = build_resource(app, model, row)
+        data = resource.serialize(row)
+        del data['id']
+        body = codec.dumps(data)
+        endpoints = [
+            ('get', resource.get, Request(app, 'GET', ident='1', headers=headers)),
+            ('list', resource.list, Request(app, 'GET', headers=headers)),
+            ('create', resource.create, Request(app, 'POST', body=body, headers=headers)),
+            ('update', resource.update, Request(app, 'PUT', ident='1', body=body,
+                                                headers=headers)),
+        ]
+        for endpoint, handler, request in endpoints:
+            per_request, encodes = bench_endpoint(loop, codec, handler, request)
+            print('{:<10} {:<7} {:8.1f} us/request  encodes/request: {:.0f}'.format(
+                name, endpoint, per_request * 1e6, encodes))
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,56 @@
+""" Compares per-request SQLAlchemy query compilation with compiled query cache.
+
+Run from the project root:
+
+    python3 -m benchmarks.queries
+"""
+import timeit
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from rest_utils.queries import QueryCache
+from test_service.models import Test
+
+NUMBER = 2000
+
+dialect = PGDialect_psycopg2()
+table = Test.__table__
+lookup_key = table.c.id
+data = {'text': 'value'}
+
+
+OPERATIONS = {
+    'get': (lambda: table.select().where(lookup_key == 1),
+            lambda: table.select().where(lookup_key == bindparam('lookup_ident')),
+            None),
+    'create': (lambda: table.insert().values(**data).returning(*table.columns),
+               lambda: table.insert().returning(*table.columns),
+               ('text',)),
+    'update': (lambda: table.update().where(lookup_key == 1).values(**data).returning(*table.columns),
+               lambda: table.update().where(lookup_key == bindparam('lookup_ident')).
+               returning(*table.columns),
+               ('text',)),
+    'delete': (lambda: table.delete().where(lookup_key == 1),
+               lambda: table.delete().where(lookup_key == bindparam('lookup_ident')),
+               None),
+}
+
+
+def bench():
+    cache = QueryCache()
+    for operation, (build, template, column_keys) in sorted(OPERATIONS.items()):
+        def compile_each_time():
+            compiled = build().compile(dialect=dialect)
+            return str(compiled), compiled.construct_params()
+
+        def cached():
+            query = cache.get(operation, template, dialect, column_keys)
+            return query.sql, dict(data, lookup_ident=1)
+
+        before = min(timeit.repeat(compile_each_time, number=NUMBER, repeat=3)) / NUMBER
+        after = min(timeit.repeat(cached, number=NUMBER, repeat=3)) / NUMBER
+        print('{:<7} compile: {:8.1f} us  cached: {:6.2f} us'.format(
+            operation, before * 1e6, after * 1e6))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,57 @@
+""" Compares generic trafaret serialization with trusted output mode.
+
+Run from the project root:
+
+    python3 -m benchmarks.serializer
+"""
+import datetime
+import timeit
+from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy.ext.declarative import declarative_base
+from rest_utils.validator import ModelSerializer
+from test_service.models import Test
+
+WIDE_COLUMNS = 40
+ROWS = 1000
+
+Base = declarative_base()
+
+
+def build_wide_model():
+    attrs = {'__tablename__': 'wide', 'id': Column(Integer, primary_key=True)}
+    for i in range(WIDE_COLUMNS):
+        column_type = (String(64), Integer, DateTime, Boolean)[i % 4]
+        attrs['col_{}'.format(i)] = Column(column_type, nullable=bool(i % 2))
+    return type('Wide', (Base,), attrs)
+
+
+def build_row(model):
+    values = {String: 'value', Integer: 42, DateTime: datetime.datetime.now(), Boolean: True}
+    row = {}
+    for column in model.__table__.columns:
+        for column_type, value in values.items():
+            if isinstance(column.type, column_type):
+                row[column.name] = value
+    return row
+
+
+class TrustedSerializer(ModelSerializer):
+    TRUSTED_OUTPUT = True
+
+
+def bench(model):
+    rows = [build_row(model)] * ROWS
+    for serializer_class in (ModelSerializer, TrustedSerializer):
+        serializer = serializer_class(model)
+        serializer.precompile()
+        single = min(timeit.repeat(lambda: [serializer.serialize(row) for row in rows],
+                                   number=1, repeat=5))
+        many = min(timeit.repeat(lambda: serializer.serialize_many(rows),
+                                 number=1, repeat=5))
+        print('{:<8} {:<18} serialize: {:8.2f} ms  serialize_many: {:8.2f} ms'.format(
+            model.__name__, serializer_class.__name__, single * 1000, many * 1000))
+
+
+if __name__ == "__main__":
+    bench(Test)
+    bench(build_wide_model())
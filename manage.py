@@ -3,12 +3,14 @@ from aio_manager import Manager
 from aio_manager.commands.ext import sqlalchemy
 from test_service import settings
 from test_service.app import build_application
+from test_service.commands import Serve
 from test_service.models import Base
 
 logging.basicConfig(level=logging.WARNING)
 
 app = build_application()
 manager = Manager(app)
+manager.add_command(Serve(app, build_application))
 
 sqlalchemy.configure_manager(manager, app, Base,
                              settings.DATABASE_USERNAME,
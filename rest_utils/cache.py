@@ -0,0 +1,114 @@
+import asyncio
+import time
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+
+
+class BaseCache(metaclass=ABCMeta):
+    """ Cache backend interface. Stores already serialized response bodies.
+    All operations are coroutines, so backends may go over the network.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    @asyncio.coroutine
+    def get(self, key):
+        """ Returns stored bytes or None
+        """
+        pass
+
+    @abstractmethod
+    @asyncio.coroutine
+    def set(self, key, value):
+        pass
+
+    @abstractmethod
+    @asyncio.coroutine
+    def delete(self, *keys):
+        pass
+
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+
+class LRUCache(BaseCache):
+    """ In-process LRU cache with TTL and size limit
+    """
+
+    def __init__(self, max_size=1024, ttl=60, clock=time.monotonic):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    @asyncio.coroutine
+    def get(self, key):
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if expires < self._clock():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    @asyncio.coroutine
+    def set(self, key, value):
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @asyncio.coroutine
+    def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        stats = super().stats()
+        stats['size'] = len(self._entries)
+        return stats
+
+
+class RedisCache(BaseCache):
+    """ Cache stored in Redis. Takes aioredis-like client having
+    get, set(key, value, expire=...) and delete coroutines.
+    Evictions are done by Redis itself and are not counted.
+    """
+
+    def __init__(self, redis, ttl=60, prefix='rest_utils:'):
+        super().__init__()
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @asyncio.coroutine
+    def get(self, key):
+        value = yield from self.redis.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @asyncio.coroutine
+    def set(self, key, value):
+        yield from self.redis.set(self.prefix + key, value, expire=self.ttl)
+
+    @asyncio.coroutine
+    def delete(self, *keys):
+        if keys:
+            yield from self.redis.delete(*[self.prefix + key for key in keys])
@@ -0,0 +1,234 @@
+import datetime
+import json
+
+
+class JSONCodec:
+    """ Stdlib JSON codec. Encodes straight to bytes and decodes from bytes.
+    """
+    name = 'json'
+    media_type = 'application/json'
+    content_type = 'application/json; charset=utf-8'
+    aliases = ()  # other media types accepted for the codec
+    native_datetime = False  # datetimes are passed to dumps as is, not as strings
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode()
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self.loads = orjson.loads
+
+    def dumps(self, obj):
+        # non-str keys (e.g. validation errors keyed by item index) as stdlib json does
+        return self._orjson.dumps(obj, option=self._orjson.OPT_NON_STR_KEYS)
+
+
+class UjsonCodec(JSONCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False).encode()
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+class RapidjsonCodec(JSONCodec):
+    name = 'rapidjson'
+
+    def __init__(self):
+        import rapidjson
+        self._rapidjson = rapidjson
+
+    def dumps(self, obj):
+        mapping_mode = self._rapidjson.MM_COERCE_KEYS_TO_STRINGS
+        return self._rapidjson.dumps(obj, ensure_ascii=False,
+                                     mapping_mode=mapping_mode).encode()
+
+    def loads(self, data):
+        return self._rapidjson.loads(data)
+
+
+class MsgpackCodec:
+    """ MessagePack codec. Datetimes are encoded as msgpack timestamps,
+    naive ones are taken as UTC.
+    """
+    name = 'msgpack'
+    media_type = 'application/msgpack'
+    content_type = 'application/msgpack'
+    aliases = ('application/x-msgpack',)
+    native_datetime = True
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, obj):
+        return self._msgpack.packb(obj, use_bin_type=True, datetime=True,
+                                   default=self._default)
+
+    def _default(self, obj):
+        if isinstance(obj, datetime.datetime) and obj.tzinfo is None:
+            return obj.replace(tzinfo=datetime.timezone.utc)  # packed natively then
+        raise TypeError('{!r} is not MessagePack serializable'.format(obj))
+
+    def loads(self, data):
+        return self._msgpack.unpackb(data, raw=False, timestamp=3)
+
+
+class CBORCodec:
+    """ CBOR codec (RFC 7049). Datetimes are encoded as epoch timestamps,
+    naive ones are taken as UTC.
+    """
+    name = 'cbor'
+    media_type = 'application/cbor'
+    content_type = 'application/cbor'
+    aliases = ()
+    native_datetime = True
+
+    def __init__(self):
+        import cbor2
+        self._cbor2 = cbor2
+
+    def dumps(self, obj):
+        return self._cbor2.dumps(obj, timezone=datetime.timezone.utc,
+                                 datetime_as_timestamp=True)
+
+    def loads(self, data):
+        try:
+            return self._cbor2.loads(data)
+        except self._cbor2.CBORDecodeError as e:
+            raise ValueError(str(e))  # as other codecs do
+
+
+codecs = {}
+default_codec = JSONCodec()
+
+
+def register_codec(codec_class):
+    """ Registers codec class by its name
+    """
+    codecs[codec_class.name] = codec_class
+    return codec_class
+
+
+for codec_class in (JSONCodec, OrjsonCodec, UjsonCodec, RapidjsonCodec,
+                    MsgpackCodec, CBORCodec):
+    register_codec(codec_class)
+
+
+def get_codec(name):
+    """ Instantiates registered codec. Raises ImportError if its backend
+    is not installed.
+    """
+    try:
+        codec_class = codecs[name]
+    except KeyError:
+        raise Exception('codec {} is not registered'.format(name))
+    return codec_class()
+
+
+def get_fastest_codec():
+    """ Returns first importable codec of orjson, ujson, rapidjson
+    falling back to stdlib json
+    """
+    for name in ('orjson', 'ujson', 'rapidjson'):
+        try:
+            return get_codec(name)
+        except ImportError:
+            continue
+    return default_codec
+
+
+def setup(app, name=None):
+    """ Configures JSON codec of the Application.
+    If name is not specified, fastest available codec is chosen.
+    """
+    app['json_codec'] = get_fastest_codec() if name is None else get_codec(name)
+
+
+def setup_render_codecs(app, names):
+    """ Adds alternative wire formats (e.g. msgpack, cbor) to negotiate
+    responses and request bodies with. Codecs which backend is not installed
+    are skipped.
+    """
+    render_codecs = app.setdefault('render_codecs', [])
+    for name in names:
+        try:
+            render_codecs.append(get_codec(name))
+        except ImportError:
+            continue
+
+
+def app_codec(app):
+    return app.get('json_codec', default_codec)
+
+
+def app_render_codecs(app):
+    """ Codecs responses can be rendered with, in order of preference.
+    Alternative wire formats are added to app['render_codecs'].
+    """
+    return [app_codec(app)] + app.get('render_codecs', [])
+
+
+def parse_accept(accept):
+    """ Parses Accept header into media types ordered by quality
+    """
+    media_types = []
+    for i, item in enumerate(accept.split(',')):
+        media_type, *params = item.strip().split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            media_types.append((-quality, i, media_type.strip().lower()))
+    return [media_type for _, _, media_type in sorted(media_types)]
+
+
+def negotiate(accept, codecs):
+    """ Picks codec for Accept header value. Falls back to the first codec
+    when nothing matches, so clients not sending Accept get the default format.
+    """
+    if not accept:
+        return codecs[0]
+    for media_type in parse_accept(accept):
+        if media_type == '*/*':
+            return codecs[0]
+        for codec in codecs:
+            if media_type == codec.media_type or media_type in codec.aliases:
+                return codec
+            if media_type.endswith('/*') and \
+               codec.media_type.startswith(media_type[:-1]):
+                return codec
+    return codecs[0]
+
+
+def codec_for_content_type(content_type, codecs):
+    """ Picks codec request body is encoded with. Falls back to the first
+    codec when Content-Type is missing or unknown.
+    """
+    if content_type:
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        for codec in codecs:
+            if media_type == codec.media_type or media_type in codec.aliases:
+                return codec
+    return codecs[0]
@@ -0,0 +1,174 @@
+import asyncio
+import zlib
+from aiohttp import web
+from rest_utils.conditional import encoded_etag
+from rest_utils.instrumentation import timed
+from rest_utils.response import add_vary
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality=4):
+        import brotli
+        self._brotli = brotli
+        self.quality = quality
+
+    def compress(self, data):
+        return self._brotli.compress(data, quality=self.quality)
+
+
+class ZstdEncoder:
+    name = 'zstd'
+
+    def __init__(self, level=3):
+        import zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+
+encoders = {}
+
+
+def register_encoder(encoder_class):
+    """ Registers content encoding by its name
+    """
+    encoders[encoder_class.name] = encoder_class
+    return encoder_class
+
+
+for encoder_class in (GzipEncoder, BrotliEncoder, ZstdEncoder):
+    register_encoder(encoder_class)
+
+
+def parse_accept_encoding(accept_encoding):
+    """ Parses Accept-Encoding header into mapping of coding to quality
+    """
+    codings = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.strip().split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            codings[coding.strip().lower()] = quality
+    return codings
+
+
+class Compressor:
+    """ Compresses response bodies with the best content encoding client accepts.
+    Bodies smaller than min_size are sent as is, compression of bodies
+    of offload_size and more runs in executor so event loop isn't blocked.
+
+    Encodings are given in order of server preference, ones which backend
+    is not installed are skipped.
+    """
+    COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/msgpack',
+                          'application/cbor', 'text/')
+
+    def __init__(self, loop, encodings=('zstd', 'br', 'gzip'), min_size=1024,
+                 offload_size=64 * 1024, executor=None):
+        self.loop = loop
+        self.encoders = []
+        for name in encodings:
+            try:
+                self.encoders.append(encoders[name]())
+            except ImportError:
+                continue
+        self.min_size = min_size
+        self.offload_size = offload_size
+        self.executor = executor
+        self.compressed = 0
+        self.offloaded = 0
+
+    def choose(self, request, size):
+        """ Picks encoder for body of given size or None if it should not be compressed
+        """
+        if size < self.min_size:
+            return None
+        accept_encoding = request.headers.get('ACCEPT-ENCODING')
+        if not accept_encoding:
+            return None
+        codings = parse_accept_encoding(accept_encoding)
+        best, best_quality = None, 0
+        for encoder in self.encoders:
+            quality = codings.get(encoder.name, codings.get('*', 0))
+            if quality > best_quality:
+                best, best_quality = encoder, quality
+        return best
+
+    def is_compressible(self, response):
+        content_type = response.headers.get('CONTENT-TYPE', '')
+        return any(content_type.startswith(prefix) for prefix in self.COMPRESSIBLE_TYPES)
+
+    @asyncio.coroutine
+    def compress(self, encoder, body):
+        self.compressed += 1
+        if len(body) >= self.offload_size:
+            self.offloaded += 1
+            return (yield from self.loop.run_in_executor(self.executor, encoder.compress, body))
+        return encoder.compress(body)
+
+    def apply(self, response, encoder, compressed):
+        """ Replaces response body with its compressed variant,
+        ETag gets encoding suffix (see rest_utils.conditional.encoded_etag)
+        """
+        response.body = compressed
+        response.headers['Content-Encoding'] = encoder.name
+        etag = response.headers.get('ETAG')
+        if etag is not None:
+            response.headers['ETag'] = encoded_etag(etag, encoder.name)
+        add_vary(response, 'Accept-Encoding')
+
+    def stats(self):
+        return {'encodings': [encoder.name for encoder in self.encoders],
+                'compressed': self.compressed,
+                'offloaded': self.offloaded}
+
+
+def setup(app, **kwargs):
+    """ Configures app['compressor'] used by compression_middleware
+    and by resources to store precompressed cache entries
+    """
+    app['compressor'] = Compressor(app.loop, **kwargs)
+
+
+def app_compressor(app):
+    return app.get('compressor')
+
+
+@asyncio.coroutine
+def compression_middleware(app, handler):
+    @asyncio.coroutine
+    def middleware(request):
+        response = yield from handler(request)
+        compressor = app_compressor(app)
+        if compressor is None or not isinstance(response, web.Response) or \
+           response.body is None or 'CONTENT-ENCODING' in response.headers or \
+           not compressor.is_compressible(response):
+            return response
+        encoder = compressor.choose(request, len(response.body))
+        if encoder is not None:
+            with timed(request, 'compress'):
+                compressed = yield from compressor.compress(encoder, response.body)
+            compressor.apply(response, encoder, compressed)
+        return response
+    return middleware
@@ -0,0 +1,46 @@
+import hashlib
+
+
+def compute_etag(data):
+    """ Builds strong ETag for bytes
+    """
+    return '"{}"'.format(hashlib.sha1(data).hexdigest())
+
+
+def encoded_etag(etag, encoding):
+    """ ETag of the content-encoded (compressed) variant of the representation,
+    e.g. "abc" -> "abc-gzip", so byte-different variants don't share strong ETag
+    """
+    if etag.startswith('W/'):
+        return 'W/' + encoded_etag(etag[2:], encoding)
+    return '{}-{}"'.format(etag[:-1], encoding)
+
+
+def parse_etags(header):
+    return [etag.strip() for etag in header.split(',') if etag.strip()]
+
+
+def matching_etag(header, etag, weak=False):
+    """ Finds If-Match / If-None-Match header entry matching ETag or its
+    content-encoded variant (see encoded_etag).
+    If-None-Match uses weak comparison, If-Match uses strong one (RFC 7232).
+    :return: matched entry without W/ prefix, or None
+    """
+    if not header:
+        return None
+    variant_prefix = etag[:-1] + '-'
+    for candidate in parse_etags(header):
+        if candidate == '*':
+            return candidate
+        if weak and candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag or candidate.startswith(variant_prefix) and \
+           candidate.endswith('"'):
+            return candidate
+    return None
+
+
+def etag_matches(header, etag, weak=False):
+    """ Checks If-Match / If-None-Match header value against ETag
+    """
+    return matching_etag(header, etag, weak) is not None
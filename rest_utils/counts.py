@@ -0,0 +1,64 @@
+import asyncio
+from abc import ABCMeta, abstractmethod
+from sqlalchemy import func, select
+from rest_utils.cache import LRUCache
+
+
+class BaseCount(metaclass=ABCMeta):
+    """ Strategy computing total number of instances for list responses.
+    Query is the filtered base query without ordering and pagination.
+    """
+
+    def count_query(self, query):
+        return select([func.count()]).select_from(query.alias('total_count'))
+
+    @abstractmethod
+    @asyncio.coroutine
+    def count(self, resource, request, query):
+        pass
+
+
+class ExactCount(BaseCount):
+    """ Exact COUNT(*), slow on big tables
+    """
+
+    @asyncio.coroutine
+    def count(self, resource, request, query):
+        with (yield from resource.get_read_engine(request)) as conn:
+            result = yield from conn.execute(self.count_query(query))
+            total = yield from result.scalar()
+        return total
+
+
+class EstimatedCount(BaseCount):
+    """ Postgres planner row estimate. Cheap, but approximate: precision
+    depends on table statistics (reltuples) kept by ANALYZE.
+    """
+
+    @asyncio.coroutine
+    def count(self, resource, request, query):
+        engine = resource.get_read_engine(request)
+        compiled = query.compile(dialect=engine.dialect)
+        with (yield from engine) as conn:
+            result = yield from conn.execute(
+                'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+            plan = yield from result.scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCount(ExactCount):
+    """ Exact count cached per filter set for ttl seconds
+    """
+
+    def __init__(self, ttl=60, max_size=1024):
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    @asyncio.coroutine
+    def count(self, resource, request, query):
+        compiled = query.compile(dialect=resource.get_engine().dialect)
+        key = '{}:{}'.format(compiled, sorted(compiled.params.items()))
+        total = yield from self.cache.get(key)
+        if total is None:
+            total = yield from super().count(resource, request, query)
+            yield from self.cache.set(key, total)
+        return total
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import OrderedDict
+from rest_utils.metrics import Histogram
+
+
+class _ConnectionContextManager:
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            self._pool.release(self._conn)
+        finally:
+            self._pool = None
+            self._conn = None
+
+
+class _SharedConnectionContextManager:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def __enter__(self):
+        return self._owner.conn
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._owner.busy = False  # connection is released at the end of request
+
+
+class ConnectionPool:
+    """ aiopg.sa Engine wrapper collecting pool metrics:
+    connections in use, waiting acquirers and acquire latency histogram.
+
+    Supports the same idioms as Engine:
+
+        with (yield from pool) as conn:
+            ...
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.in_use = 0
+        self.waiting = 0
+        self.acquire_latency = Histogram()
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    @asyncio.coroutine
+    def acquire(self):
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            conn = yield from self.engine.acquire()
+        finally:
+            self.waiting -= 1
+        self.acquire_latency.observe(time.monotonic() - started)
+        self.in_use += 1
+        return conn
+
+    def release(self, conn):
+        self.in_use -= 1
+        self.engine.release(conn)
+
+    def __iter__(self):
+        conn = yield from self.acquire()
+        return _ConnectionContextManager(self, conn)
+
+    def stats(self):
+        return {'size': self.engine.size,
+                'freesize': self.engine.freesize,
+                'minsize': self.engine.minsize,
+                'maxsize': self.engine.maxsize,
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'acquire_latency': self.acquire_latency.as_dict()}
+
+
+class RequestConnection:
+    """ Connection acquired lazily on first use and shared by everything
+    done within the request. Released by connection_middleware.
+    Connection can't run queries concurrently: while it's used (for the whole
+    `with` block) concurrent users get their own connections from the pool.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+        self.busy = False
+
+    def __iter__(self):
+        if self.busy:
+            conn = yield from self.pool.acquire()
+            return _ConnectionContextManager(self.pool, conn)
+        self.busy = True  # taken before acquire, so first concurrent uses don't race
+        if self.conn is None:
+            try:
+                self.conn = yield from self.pool.acquire()
+            except BaseException:
+                self.busy = False
+                raise
+        return _SharedConnectionContextManager(self)
+
+    def release(self):
+        if self.conn is not None:
+            conn, self.conn = self.conn, None
+            self.pool.release(conn)
+
+
+@asyncio.coroutine
+def connection_middleware(app, handler):
+    @asyncio.coroutine
+    def middleware(request):
+        request['db_connection'] = RequestConnection(app['db_engine'])
+        if app.get('db_replicas') is not None:
+            request['db_replica_connection'] = RequestConnection(app['db_replicas'])
+        try:
+            return (yield from handler(request))
+        finally:
+            request['db_connection'].release()
+            if 'db_replica_connection' in request:
+                request['db_replica_connection'].release()
+    return middleware
+
+
+class ReplicaSet:
+    """ Pool of read replicas. Every acquire picks a replica with
+    `round_robin` or `least_busy` (fewest connections in use and waiting)
+    strategy.
+
+    Clients that have written recently are pinned to primary for
+    sticky_window seconds, so they read their own writes despite replication lag.
+    """
+    STRATEGIES = ('round_robin', 'least_busy')
+
+    def __init__(self, pools, strategy='round_robin', sticky_window=0):
+        if not pools:
+            raise Exception('ReplicaSet needs at least one pool')
+        if strategy not in self.STRATEGIES:
+            raise Exception('Unknown replica selection strategy {}'.format(strategy))
+        self.pools = list(pools)
+        self.strategy = strategy
+        self.sticky_window = sticky_window
+        self._next = 0
+        self._owners = {}
+        self._written = OrderedDict()  # client -> expiration, oldest first
+
+    @property
+    def dialect(self):
+        return self.pools[0].dialect
+
+    def select(self):
+        if self.strategy == 'least_busy':
+            return min(self.pools, key=lambda pool: pool.in_use + pool.waiting)
+        pool = self.pools[self._next % len(self.pools)]
+        self._next += 1
+        return pool
+
+    @asyncio.coroutine
+    def acquire(self):
+        pool = self.select()
+        conn = yield from pool.acquire()
+        self._owners[id(conn)] = pool
+        return conn
+
+    def release(self, conn):
+        self._owners.pop(id(conn)).release(conn)
+
+    def __iter__(self):
+        conn = yield from self.acquire()
+        return _ConnectionContextManager(self, conn)
+
+    def mark_written(self, client):
+        """ Pins client to primary, dropping clients whose window has expired
+        """
+        if self.sticky_window:
+            now = time.monotonic()
+            self._written.pop(client, None)
+            self._written[client] = now + self.sticky_window
+            while next(iter(self._written.values())) < now:
+                self._written.popitem(last=False)
+
+    def is_sticky(self, client):
+        expires = self._written.get(client)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._written[client]
+            return False
+        return True
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
+
+    @asyncio.coroutine
+    def wait_closed(self):
+        for pool in self.pools:
+            yield from pool.wait_closed()
+
+    def stats(self):
+        return {'strategy': self.strategy,
+                'sticky_clients': len(self._written),
+                'replicas': [pool.stats() for pool in self.pools]}
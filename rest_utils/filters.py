@@ -0,0 +1,124 @@
+import logging
+import operator
+import trafaret as t
+from sqlalchemy import PrimaryKeyConstraint, String, UniqueConstraint
+from rest_utils.validator import GenericFieldValidatorBuilder
+
+logger = logging.getLogger(__name__)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class FilterSet:
+    """ Compiles declared filters into SQLAlchemy where clauses.
+
+    Filters are declared as {field: [operator, ...]} and passed in query
+    string as `field__operator=value` (`field=value` means `exact`), e.g.
+
+    filter_fields = {'text': ['exact', 'startswith'],
+                     'id': ['in', 'gte', 'lte']}
+
+    Values are validated by trafarets built with the model validator builders.
+    """
+    OPERATORS = {
+        'exact': operator.eq,
+        'ne': operator.ne,
+        'lt': operator.lt,
+        'lte': operator.le,
+        'gt': operator.gt,
+        'gte': operator.ge,
+        'in': lambda column, value: column.in_(value),
+        'startswith': lambda column, value: column.like(_escape_like(value) + '%', escape='\\'),
+        'contains': lambda column, value: column.like('%' + _escape_like(value) + '%', escape='\\'),
+        'isnull': lambda column, value: column.is_(None) if value else column.isnot(None),
+    }
+    TEXT_OPERATORS = frozenset(['startswith', 'contains'])
+    SEPARATOR = '__'
+
+    def __init__(self, table, filter_fields):
+        self.table = table
+        self._trafarets = {}
+        for name, operators in filter_fields.items():
+            if name not in table.columns:
+                raise Exception('{} has no column {} to filter by'.format(table.name, name))
+            for op in operators:
+                if op not in self.OPERATORS:
+                    raise Exception('Unknown filter operator {}'.format(op))
+                if op in self.TEXT_OPERATORS and not isinstance(table.c[name].type, String):
+                    raise Exception('{} filter needs string column, {}.{} is not'.format(
+                        op, table.name, name))
+                self._trafarets[name, op] = self.build_trafaret(table.c[name], op)
+
+    def build_trafaret(self, column, op):
+        if op == 'isnull':
+            return t.StrBool()
+        if op in self.TEXT_OPERATORS:
+            return t.String()
+        trafaret = GenericFieldValidatorBuilder(column).default_cut(column)
+        if op == 'in':
+            return t.String() >> (lambda value: value.split(',')) >> t.List(trafaret, min_length=1)
+        return trafaret
+
+    def __bool__(self):
+        return bool(self._trafarets)
+
+    @property
+    def fields(self):
+        return set(name for name, _ in self._trafarets)
+
+    def parse_key(self, key):
+        name, _, op = key.partition(self.SEPARATOR)
+        return name, op or 'exact'
+
+    def parse(self, params, ignore=()):
+        """ Validates filter parameters
+        :param params: query string MultiDict
+        :param ignore: names of non-filter parameters
+        :return: list of (column name, operator, value)
+        """
+        filters, errors = [], {}
+        for key, value in params.items():
+            if key in ignore:
+                continue
+            try:
+                trafaret = self._trafarets[self.parse_key(key)]
+            except KeyError:
+                errors[key] = 'filter is not allowed'
+                continue
+            try:
+                filters.append(self.parse_key(key) + (trafaret.check(value),))
+            except t.DataError as e:
+                errors[key] = e.as_dict()
+        if errors:
+            raise t.DataError(errors)
+        return filters
+
+    def apply(self, query, filters):
+        for name, op, value in filters:
+            query = query.where(self.OPERATORS[op](self.table.c[name], value))
+        return query
+
+
+def indexed_columns(table):
+    """ Names of columns leading some index, primary key or unique constraint
+    """
+    leading = set()
+    for index in table.indexes:
+        leading.add(list(index.columns)[0].name)
+    for constraint in table.constraints:
+        if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)):
+            columns = list(constraint.columns)
+            if columns:
+                leading.add(columns[0].name)
+    return leading
+
+
+def check_indexes(table, column_names, purpose):
+    """ Warns about columns without supporting index
+    """
+    indexed = indexed_columns(table)
+    for name in sorted(set(column_names) - indexed):
+        logger.warning('%s.%s is %s but has no supporting index',
+                       table.name, name, purpose)
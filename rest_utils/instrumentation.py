@@ -0,0 +1,240 @@
+""" Per-route latency histograms split into request phases
+(permissions, parse, validate, query, cache, serialize, encode, compress),
+exposed in Prometheus text format.
+
+Resources time their phases with `with timed(request, 'query'): ...`.
+Without metrics_middleware installed, timed() returns a shared no-op
+context manager, so disabled instrumentation costs a dict lookup per phase.
+"""
+import asyncio
+import time
+from aiohttp import web
+from rest_utils.metrics import DEFAULT_BUCKETS, Histogram
+from rest_utils.queries import query_cache
+from rest_utils.validator import registry
+
+
+class PhaseTimings(dict):
+    """ Wall time spent in every phase of the request. Nested and concurrent
+    timers of the same phase are merged, so overlapping time is counted once.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._depth = {}
+        self._started = {}
+
+    def enter(self, phase):
+        depth = self._depth.get(phase, 0)
+        if not depth:
+            self._started[phase] = time.perf_counter()
+        self._depth[phase] = depth + 1
+
+    def exit(self, phase):
+        depth = self._depth[phase] - 1
+        self._depth[phase] = depth
+        if not depth:
+            self[phase] = self.get(phase, 0.0) + time.perf_counter() - self._started[phase]
+
+
+class _PhaseTimer:
+    __slots__ = ('timings', 'phase')
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings.enter(self.phase)
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.timings.exit(self.phase)
+
+
+class _NullTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, tb):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def timed(request, phase):
+    """ Context manager adding time spent in the block to the request phase
+    """
+    timings = request.get('timings') if request is not None else None
+    if timings is None:
+        return _null_timer
+    return _PhaseTimer(timings, phase)
+
+
+class RouteMetrics:
+    """ Request latency and phase latency histograms keyed by route name.
+    Only named routes are observed, so label cardinality stays bounded.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.latency = {}  # route -> Histogram
+        self.phases = {}  # (route, phase) -> Histogram
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, route, duration, timings):
+        self._histogram(self.latency, route).observe(duration)
+        for phase, spent in timings.items():
+            self._histogram(self.phases, (route, phase)).observe(spent)
+
+    def render(self, app):
+        """ Renders metrics in Prometheus text exposition format
+        """
+        lines = []
+        write_histogram_family(
+            lines, 'http_request_duration_seconds', 'Request latency by route',
+            [({'route': route}, histogram)
+             for route, histogram in sorted(self.latency.items())])
+        write_histogram_family(
+            lines, 'http_request_phase_duration_seconds',
+            'Time spent in request phase by route',
+            [({'route': route, 'phase': phase}, histogram)
+             for (route, phase), histogram in sorted(self.phases.items())])
+        write_pool_metrics(lines, app_pools(app))
+        for prefix, help_text, sources in app_cache_stats(app):
+            write_stats_family(lines, prefix, help_text, sources)
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').
+                                     replace('"', '\\"').replace('\n', '\\n'))
+                    for name, value in labels.items())
+
+
+def format_value(value):
+    if value == '+Inf':
+        return value
+    return repr(float(value))
+
+
+def write_histogram_family(lines, name, help_text, histograms):
+    lines.append('# HELP {} {}'.format(name, help_text))
+    lines.append('# TYPE {} histogram'.format(name))
+    for labels, histogram in histograms:
+        for bound, count in histogram.cumulative():
+            bucket_labels = dict(labels, le=format_value(bound))
+            lines.append('{}_bucket{{{}}} {}'.format(name, format_labels(bucket_labels), count))
+        lines.append('{}_sum{{{}}} {}'.format(name, format_labels(labels),
+                                               format_value(histogram.sum)))
+        lines.append('{}_count{{{}}} {}'.format(name, format_labels(labels), histogram.count))
+
+
+def app_pools(app):
+    """ Returns [(name, pool)] of rest_utils.db.ConnectionPool's of the application
+    """
+    pools = []
+    if hasattr(app.get('db_engine'), 'acquire_latency'):
+        pools.append(('primary', app['db_engine']))
+    replicas = app.get('db_replicas')
+    if replicas is not None:
+        pools.extend(('replica{}'.format(i), pool) for i, pool in enumerate(replicas.pools))
+    return pools
+
+
+def write_pool_metrics(lines, pools):
+    if not pools:
+        return
+    write_histogram_family(
+        lines, 'db_pool_acquire_duration_seconds', 'Time waiting for a pool connection',
+        [({'pool': name}, pool.acquire_latency) for name, pool in pools])
+    stats = [(name, pool.stats()) for name, pool in pools]
+    for metric, help_text in (('in_use', 'Connections in use'),
+                              ('waiting', 'Acquirers waiting for a connection'),
+                              ('size', 'Open connections'),
+                              ('maxsize', 'Pool size limit')):
+        name = 'db_pool_{}'.format(metric)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} gauge'.format(name))
+        for pool_name, pool_stats in stats:
+            lines.append('{}{{pool="{}"}} {}'.format(name, pool_name, pool_stats[metric]))
+
+
+def app_cache_stats(app):
+    """ Returns [(metric prefix, help, [(labels, stats)])] of in-process caches,
+    stats are `stats()` dicts of counters and `size`
+    """
+    families = [('trafaret_registry', 'Compiled trafarets', [({}, registry.stats())]),
+                ('query_cache', 'Compiled SQL queries', [({}, query_cache.stats())])]
+    caches = app.get('response_caches')
+    if caches:  # cache -> name of the first resource using it
+        families.append(('response_cache', 'Serialized instance cache',
+                         [({'cache': name}, cache.stats()) for cache, name in caches.items()]))
+    return families
+
+
+def write_stats_family(lines, prefix, help_text, sources):
+    """ Writes stats counters as Prometheus counters, `size` as gauge
+    """
+    for stat in sorted(set(stat for _, stats in sources for stat in stats)):
+        if stat == 'size':
+            name, kind = '{}_size'.format(prefix), 'gauge'
+        else:
+            name, kind = '{}_{}_total'.format(prefix, stat), 'counter'
+        lines.append('# HELP {} {}: {}'.format(name, help_text, stat))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for labels, stats in sources:
+            if stat in stats:
+                lines.append('{}{} {}'.format(
+                    name, '{{{}}}'.format(format_labels(labels)) if labels else '', stats[stat]))
+
+
+def app_route_metrics(app):
+    return app.get('route_metrics')
+
+
+def route_name(request):
+    match_info = request.match_info
+    route = getattr(match_info, 'route', None)
+    return getattr(route, 'name', None)
+
+
+@asyncio.coroutine
+def metrics_middleware(app, handler):
+    """ Times the request and its phases. Should be the outermost middleware,
+    so compression is accounted.
+    """
+    metrics = app_route_metrics(app)
+    if metrics is None:
+        return handler
+
+    @asyncio.coroutine
+    def middleware(request):
+        request['timings'] = timings = PhaseTimings()
+        started = time.perf_counter()
+        try:
+            return (yield from handler(request))
+        finally:
+            name = route_name(request)
+            if name is not None:
+                metrics.observe(name, time.perf_counter() - started, timings)
+    return middleware
+
+
+@asyncio.coroutine
+def metrics_handler(request):
+    body = app_route_metrics(request.app).render(request.app)
+    return web.Response(body=body.encode(),
+                        content_type='text/plain; version=0.0.4')
+
+
+def setup(app, path='/metrics', buckets=DEFAULT_BUCKETS):
+    """ Enables metrics_middleware and serves collected metrics on path
+    """
+    app['route_metrics'] = RouteMetrics(buckets)
+    app.router.add_route('GET', path, metrics_handler, name='metrics')
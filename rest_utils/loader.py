@@ -0,0 +1,81 @@
+import asyncio
+
+
+class DataLoader:
+    """ Coalesces loads issued within one event loop tick into a single
+    batch_load(keys) call and shares in-flight loads of the same key
+    (single-flight). batch_load is a coroutine returning mapping of key
+    to value, keys missing from the mapping resolve to None.
+
+    Values are not cached after the batch completes, so loader may live
+    as long as the application: it only saves queries running concurrently.
+    Usage: value = yield from loader.load(key)
+    """
+
+    def __init__(self, batch_load, loop=None, max_batch_size=None):
+        self.batch_load = batch_load
+        self.loop = loop or asyncio.get_event_loop()
+        self.max_batch_size = max_batch_size
+        self._futures = {}  # key -> future, queued or in flight
+        self._queue = []
+        self.loads = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    @asyncio.coroutine
+    def load(self, key):
+        self.loads += 1
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.Future(loop=self.loop)
+            if not self._queue:
+                self.loop.call_soon(self._dispatch)
+            self._queue.append((key, future))
+        else:
+            self.coalesced += 1
+        # one cancelled caller should not cancel load shared with others
+        return (yield from asyncio.shield(future, loop=self.loop))
+
+    @asyncio.coroutine
+    def load_many(self, keys):
+        return (yield from asyncio.gather(*[self.load(key) for key in keys],
+                                          loop=self.loop))
+
+    def clear(self, key):
+        """ Detaches in-flight load of key (e.g. after the row was written),
+        so following loads query the database again
+        """
+        self._futures.pop(key, None)
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        size = self.max_batch_size or len(queue)
+        for start in range(0, len(queue), size):
+            asyncio.ensure_future(self._run_batch(queue[start:start + size]), loop=self.loop)
+
+    @asyncio.coroutine
+    def _run_batch(self, queue):
+        self.batches += 1
+        keys, futures = zip(*queue)
+        try:
+            values = yield from self.batch_load(list(keys))
+        except Exception as e:
+            for key, future in zip(keys, futures):
+                self._detach(key, future)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in zip(keys, futures):
+            self._detach(key, future)
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def _detach(self, key, future):
+        if self._futures.get(key) is future:
+            del self._futures[key]
+
+    def stats(self):
+        return {'loads': self.loads,
+                'coalesced': self.coalesced,
+                'batches': self.batches,
+                'in_flight': len(self._futures)}
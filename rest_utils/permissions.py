@@ -0,0 +1,96 @@
+import asyncio
+import hmac
+
+
+class BasePermission:
+    """ Permission protocol for model resources. All hooks may be coroutines
+    doing database or service lookups; plain functions returning bool are
+    supported too.
+
+    check is called for every request, check_object for retrieved, updated
+    and deleted instances, filter_queryset restricts list and export queries.
+    """
+
+    def check(self, request):
+        return True
+
+    def check_object(self, request, instance):
+        return True
+
+    @asyncio.coroutine
+    def filter_queryset(self, request, query):
+        return query
+
+
+class TokenPermission(BasePermission):
+    """ Allows requests carrying the shared secret in header,
+    e.g. for admin and debug routes
+    """
+
+    def __init__(self, token, header='X-Debug-Token'):
+        if not token:
+            raise Exception('TokenPermission needs non-empty token')
+        self.token = token.encode()
+        self.header = header
+
+    def check(self, request):
+        return hmac.compare_digest(request.headers.get(self.header, '').encode(), self.token)
+
+
+@asyncio.coroutine
+def _resolve(result):
+    if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+        result = yield from result
+    return result
+
+
+@asyncio.coroutine
+def _memoized(request, key, call):
+    """ Runs permission check once per request, concurrent callers
+    of the same check wait for the same future
+    """
+    memo = request.setdefault('permissions_memo', {})
+    future = memo.get(key)
+    if future is None:
+        future = memo[key] = asyncio.ensure_future(_resolve(call()), loop=request.app.loop)
+    return (yield from asyncio.shield(future, loop=request.app.loop))
+
+
+@asyncio.coroutine
+def check_all(request, permissions):
+    """ Runs independent checks concurrently, one round of latency in total
+    """
+    results = yield from asyncio.gather(
+        *[_memoized(request, (id(p), 'check'), lambda p=p: p.check(request))
+          for p in permissions],
+        loop=request.app.loop)
+    return all(results)
+
+
+@asyncio.coroutine
+def check_object_all(request, permissions, instance, ident):
+    results = yield from asyncio.gather(
+        *[_memoized(request, (id(p), 'check_object', ident),
+                    lambda p=p: p.check_object(request, instance))
+          for p in permissions if _defines_check_object(p)],
+        loop=request.app.loop)
+    return all(results)
+
+
+def _defines_check_object(permission):
+    return getattr(type(permission), 'check_object', None) not in \
+        (None, BasePermission.check_object)
+
+
+def has_object_permissions(permissions):
+    """ Checks if any permission defines object level check
+    """
+    return any(_defines_check_object(p) for p in permissions)
+
+
+@asyncio.coroutine
+def filter_all(request, permissions, query):
+    for p in permissions:
+        if hasattr(p, 'filter_queryset'):
+            query = yield from _resolve(p.filter_queryset(request, query))
+    return query
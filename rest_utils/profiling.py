@@ -0,0 +1,314 @@
+""" Slow request capture and on-demand sampling profiler.
+
+slow_request_middleware records SQL statements run by resources
+(see ModelBaseResource.get_connection) with their timings. For requests
+taking threshold seconds or more it keeps the statements, phase timings
+(if rest_utils.instrumentation is enabled) and the stack the request was
+waiting at when it crossed the threshold in a ring buffer of the last N.
+
+Both are served on admin routes registered by setup(), which requires
+permissions guarding them:
+
+    GET <prefix>/slow               captured slow requests, newest first
+    GET <prefix>/profile?seconds=10 samples event loop thread stacks for
+                                    given time, collapsed stacks output
+                                    for flamegraph.pl / speedscope
+"""
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from aiohttp import web
+from aiohttp.web_exceptions import HTTPBadRequest, HTTPConflict, HTTPForbidden
+from rest_utils.codecs import app_codec
+from rest_utils.instrumentation import route_name
+from rest_utils.permissions import check_all
+from rest_utils.response import EncodedResponse
+
+
+class QueryLog:
+    """ Statements executed within the request. Only first `limit`
+    statements are kept, totals count all of them.
+    """
+
+    def __init__(self, limit=100):
+        self.limit = limit
+        self.started = time.perf_counter()
+        self.statements = []  # (query, dialect, offset, duration)
+        self.count = 0
+        self.time = 0.0
+
+    def record(self, query, dialect, started, duration):
+        self.count += 1
+        self.time += duration
+        if len(self.statements) < self.limit:
+            self.statements.append((query, dialect, started - self.started, duration))
+
+    def as_list(self, max_sql_length=1000):
+        return [{'sql': statement_text(query, dialect)[:max_sql_length],
+                 'offset': offset,
+                 'duration': duration}
+                for query, dialect, offset, duration in self.statements]
+
+
+def statement_text(query, dialect):
+    if isinstance(query, str):
+        return query
+    try:
+        return str(query.compile(dialect=dialect))
+    except Exception:
+        return repr(query)
+
+
+class TracedConnection:
+    """ Connection proxy recording executed statements into QueryLog
+    """
+
+    def __init__(self, conn, log, dialect):
+        self._conn = conn
+        self._log = log
+        self._dialect = dialect
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @asyncio.coroutine
+    def execute(self, query, *multiparams, **params):
+        started = time.perf_counter()
+        try:
+            return (yield from self._conn.execute(query, *multiparams, **params))
+        finally:
+            self._log.record(query, self._dialect, started, time.perf_counter() - started)
+
+    @asyncio.coroutine
+    def scalar(self, query, *multiparams, **params):
+        result = yield from self.execute(query, *multiparams, **params)
+        return (yield from result.scalar())
+
+
+class _TracedContextManager:
+    def __init__(self, context_manager, log, dialect):
+        self._context_manager = context_manager
+        self._log = log
+        self._dialect = dialect
+
+    def __enter__(self):
+        return TracedConnection(self._context_manager.__enter__(), self._log, self._dialect)
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return self._context_manager.__exit__(exc_type, exc_value, tb)
+
+
+class TracedSource:
+    """ Pool or request connection proxy handing out TracedConnection's:
+
+        with (yield from TracedSource(pool, log, dialect)) as conn:
+            ...
+    """
+
+    def __init__(self, source, log, dialect):
+        self._source = source
+        self._log = log
+        self._dialect = dialect
+
+    def __getattr__(self, name):
+        return getattr(self._source, name)
+
+    def __iter__(self):
+        context_manager = yield from self._source
+        return _TracedContextManager(context_manager, self._log, self._dialect)
+
+
+def trace_queries(request, source, dialect):
+    """ Wraps connection source so its statements are recorded
+    into the request query log, returns source as is if capture is disabled
+    """
+    log = request.get('query_log') if request is not None else None
+    if log is None:
+        return source
+    return TracedSource(source, log, dialect)
+
+
+def await_stack(coro):
+    """ Frames of the coroutine chain the coroutine is suspended at, outermost first
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'gi_frame', None) or getattr(coro, 'cr_frame', None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, 'gi_yieldfrom', None) or getattr(coro, 'cr_await', None)
+    return traceback.StackSummary.extract(frames).format()
+
+
+class SlowRequestLog:
+    """ Ring buffer of the last `size` requests which took threshold seconds or more
+    """
+
+    def __init__(self, threshold=0.5, size=100, query_limit=100):
+        self.threshold = threshold
+        self.query_limit = query_limit
+        self.entries = collections.deque(maxlen=size)
+        self.captured = 0
+
+    def capture(self, request, status, duration, queries, stack):
+        self.captured += 1
+        timings = request.get('timings')
+        self.entries.append({
+            'time': time.time() - duration,
+            'method': request.method,
+            'path': request.path,
+            'route': route_name(request),
+            'status': status,
+            'duration': duration,
+            'phases': dict(timings) if timings is not None else None,
+            'query_count': queries.count,
+            'query_time': queries.time,
+            'queries': queries.as_list(),
+            'stack': stack,
+        })
+
+    def as_list(self):
+        return list(reversed(self.entries))
+
+    def stats(self):
+        return {'threshold': self.threshold,
+                'captured': self.captured,
+                'size': len(self.entries)}
+
+
+class SamplingProfiler:
+    """ Samples stack of the given thread every `interval` seconds from
+    a separate thread and counts identical stacks. Only one profile runs
+    at a time.
+    """
+
+    def __init__(self, interval=0.005, max_duration=60.0):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.running = False
+
+    def profile(self, thread_id, duration, interval=None):
+        """ Blocks for duration seconds, returns Counter of collapsed stacks
+        """
+        interval = interval or self.interval
+        stacks = collections.Counter()
+        deadline = time.monotonic() + min(duration, self.max_duration)
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[collapse_stack(frame)] += 1
+            time.sleep(interval)
+        return stacks
+
+
+def collapse_stack(frame):
+    """ Formats stack as `outer;...;inner` frames, Brendan Gregg's collapsed format
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('{} ({}:{})'.format(code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def app_slow_requests(app):
+    return app.get('slow_requests')
+
+
+@asyncio.coroutine
+def slow_request_middleware(app, handler):
+    """ Records queries of every request and captures slow ones.
+    Should go right after metrics_middleware, so compression is accounted.
+    """
+    slow_requests = app_slow_requests(app)
+    if slow_requests is None:
+        return handler
+
+    @asyncio.coroutine
+    def middleware(request):
+        request['query_log'] = queries = QueryLog(slow_requests.query_limit)
+        sample = {}
+        coro = handler(request)
+        # where the request waits when it becomes slow; loop blocked by
+        # CPU bound work can't run the timer, use profiler for that
+        timer = app.loop.call_later(slow_requests.threshold,
+                                    lambda: sample.setdefault('stack', await_stack(coro)))
+        status = 500
+        try:
+            response = yield from coro
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            timer.cancel()
+            duration = time.perf_counter() - queries.started
+            if duration >= slow_requests.threshold:
+                slow_requests.capture(request, status, duration, queries, sample.get('stack'))
+    return middleware
+
+
+@asyncio.coroutine
+def check_admin_permissions(request):
+    permissions = request.app['profiling_permissions']
+    if not permissions or not (yield from check_all(request, permissions)):
+        raise HTTPForbidden()
+
+
+@asyncio.coroutine
+def slow_requests_handler(request):
+    yield from check_admin_permissions(request)
+    slow_requests = app_slow_requests(request.app)
+    return EncodedResponse({'stats': slow_requests.stats(),
+                            'requests': slow_requests.as_list()},
+                           codec=app_codec(request.app))
+
+
+@asyncio.coroutine
+def profile_handler(request):
+    """ Profiles event loop thread for `seconds` (10 by default),
+    sampling every `interval` seconds
+    """
+    yield from check_admin_permissions(request)
+    profiler = request.app['profiler']
+    try:
+        seconds = float(request.GET.get('seconds', 10))
+        interval = float(request.GET.get('interval', profiler.interval))
+    except ValueError:
+        raise HTTPBadRequest(text='seconds and interval should be numbers')
+    if seconds <= 0 or interval <= 0:
+        raise HTTPBadRequest(text='seconds and interval should be positive')
+    if profiler.running:
+        raise HTTPConflict(text='profile is already running')
+    profiler.running = True
+    try:
+        stacks = yield from request.app.loop.run_in_executor(
+            None, profiler.profile, threading.get_ident(), seconds, interval)
+    finally:
+        profiler.running = False
+    body = ''.join('{} {}\n'.format(stack, count) for stack, count in stacks.most_common())
+    return web.Response(body=body.encode(), content_type='text/plain')
+
+
+def setup(app, threshold=0.5, size=100, prefix='/_debug', permissions=(),
+          interval=0.005, max_profile_duration=60.0):
+    """ Enables slow_request_middleware and registers admin routes
+    under prefix, guarded by rest_utils.permissions `permissions`
+    (e.g. TokenPermission). Routes expose SQL and stacks, so permissions
+    are required.
+    """
+    if not permissions:
+        raise Exception('Profiling routes need permissions')
+    app['slow_requests'] = SlowRequestLog(threshold, size)
+    app['profiler'] = SamplingProfiler(interval, max_profile_duration)
+    app['profiling_permissions'] = list(permissions)
+    app.router.add_route('GET', prefix + '/slow', slow_requests_handler,
+                         name='debug-slow-requests')
+    app.router.add_route('GET', prefix + '/profile', profile_handler,
+                         name='debug-profile')
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import re
+import weakref
+from collections import OrderedDict
+
+_PARAM_RE = re.compile(r'%\((\w+)\)s')
+
+
+class CompiledQuery:
+    """ SQL text compiled once from SQLAlchemy construct, with names of its
+    parameters in order of appearance
+    """
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.param_names = []
+        for name in _PARAM_RE.findall(sql):
+            if name not in self.param_names:
+                self.param_names.append(name)
+        self.name = 'rest_utils_' + hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+    @property
+    def prepare_sql(self):
+        """ PREPARE statement with numbered parameters
+        """
+        numbers = {name: i for i, name in enumerate(self.param_names, 1)}
+        sql = _PARAM_RE.sub(lambda match: '${}'.format(numbers[match.group(1)]), self.sql)
+        return 'PREPARE {} AS {}'.format(self.name, sql.replace('%%', '%'))
+
+    @property
+    def execute_sql(self):
+        if not self.param_names:
+            return 'EXECUTE {}'.format(self.name)
+        return 'EXECUTE {} ({})'.format(
+            self.name, ', '.join('%({})s'.format(name) for name in self.param_names))
+
+
+class QueryCache:
+    """ Keeps compiled queries keyed by (resource class, operation, column set).
+    Column sets come from client-supplied fieldsets, so at most `max_size`
+    queries are kept, least recently used ones are evicted.
+    Counters `compiled` and `hits` show whether cache works.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._queries = OrderedDict()
+        self.compiled = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(self, key, query_factory, dialect, column_keys=None):
+        try:
+            query = self._queries[key]
+        except KeyError:
+            compiled = query_factory().compile(
+                dialect=dialect,
+                column_keys=list(column_keys) if column_keys is not None else None)
+            query = self._queries[key] = CompiledQuery(str(compiled))
+            self.compiled += 1
+            while len(self._queries) > self.max_size:
+                self._queries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._queries.move_to_end(key)
+            self.hits += 1
+        return query
+
+    def invalidate(self):
+        self._queries.clear()
+
+    def stats(self):
+        return {'compiled': self.compiled,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'size': len(self._queries)}
+
+
+query_cache = QueryCache()
+
+
+def is_precompilable(table, dialect):
+    """ Compiled SQL text is executed without SQLAlchemy type processing
+    and column defaults, so it's only used for tables whose column types need
+    no processing and whose defaults are SQL expressions rendered into the query
+    """
+    for column in table.columns:
+        if column.type.bind_processor(dialect) is not None or \
+           column.type.result_processor(dialect, None) is not None:
+            return False
+        for default in (column.default, column.onupdate):
+            if default is not None and not getattr(default, 'is_clause_element', False):
+                return False
+    return True
+
+
+class PreparedStatements:
+    """ Executes compiled queries as server-side prepared statements,
+    preparing every statement once per database connection
+    """
+
+    def __init__(self):
+        self._prepared = weakref.WeakKeyDictionary()
+
+    @asyncio.coroutine
+    def execute(self, conn, query, params):
+        prepared = self._prepared.setdefault(conn.connection, set())
+        if query.name not in prepared:
+            yield from conn.execute(query.prepare_sql)
+            prepared.add(query.name)
+        return (yield from conn.execute(query.execute_sql, params))
+
+
+prepared_statements = PreparedStatements()
@@ -1,15 +1,40 @@
 import asyncio
-import json
+import base64
+import datetime
 import http.client
+import re
 from abc import ABCMeta, abstractmethod
 from aiohttp import web
-from aiohttp.web_exceptions import HTTPBadRequest, HTTPNotFound, HTTPForbidden
+from aiohttp.web_exceptions import HTTPBadRequest, HTTPNotFound, HTTPForbidden, \
+    HTTPPreconditionFailed
+from collections import OrderedDict
+from sqlalchemy import Integer, and_, bindparam, select, text, tuple_
+from sqlalchemy.dialects.postgresql import UUID
+import trafaret as t
 from trafaret import DataError
-from rest_utils.response import JSONResponse
-from rest_utils.validator import ModelValidator, ModelSerializer
+from urllib.parse import quote
+from rest_utils.codecs import app_codec, app_render_codecs, negotiate, \
+    codec_for_content_type
+from rest_utils.compression import app_compressor
+from rest_utils.conditional import compute_etag, etag_matches, matching_etag
+from rest_utils.filters import FilterSet, check_indexes
+from rest_utils.instrumentation import timed
+from rest_utils.loader import DataLoader
+from rest_utils.permissions import check_all, check_object_all, filter_all, \
+    has_object_permissions
+from rest_utils.profiling import trace_queries
+from rest_utils.queries import query_cache, prepared_statements, is_precompilable
+from rest_utils.response import EncodedResponse, add_vary
+from rest_utils.validator import ModelValidator, ModelSerializer, \
+    GenericFieldValidatorBuilder, check_column_value
+
+
+SAFE_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
 
 
 class BaseResource:
+    ident_route = '{ident}'  # path segment of instance routes
+
     def __init__(self, app):
         self.app = app
 
@@ -36,7 +61,7 @@ class UpdateMixin(BaseResource, metaclass=ABCMeta):
 
     def register(self):
         super().register()
-        path_ident = self.get_path() + r'/{ident}'
+        path_ident = self.get_path() + '/' + self.ident_route
         self.app.router.add_route('PUT', path_ident,
                                   self.update, name=self.update_routename)
 
@@ -51,7 +76,7 @@ class RetrieveMixin(BaseResource, metaclass=ABCMeta):
 
     def register(self):
         super().register()
-        path_ident = self.get_path() + r'/{ident}'
+        path_ident = self.get_path() + '/' + self.ident_route
         self.app.router.add_route('GET', path_ident,
                                   self.get, name=self.get_routename)
 
@@ -66,7 +91,7 @@ class DeleteMixin(BaseResource, metaclass=ABCMeta):
 
     def register(self):
         super().register()
-        path_ident = self.get_path() + r'/{ident}'
+        path_ident = self.get_path() + '/' + self.ident_route
         self.app.router.add_route('DELETE', path_ident,
                                   self.delete, name=self.delete_routename)
 
@@ -90,6 +115,37 @@ class ListMixin(BaseResource, metaclass=ABCMeta):
         pass
 
 
+class BulkMixin(BaseResource, metaclass=ABCMeta):
+    bulk_create_routename = None
+    bulk_update_routename = None
+    bulk_delete_routename = None
+
+    def register(self):
+        super().register()
+        path_bulk = self.get_path() + r'/_bulk'
+        self.app.router.add_route('POST', path_bulk,
+                                  self.bulk_create, name=self.bulk_create_routename)
+        self.app.router.add_route('PATCH', path_bulk,
+                                  self.bulk_update, name=self.bulk_update_routename)
+        self.app.router.add_route('DELETE', path_bulk,
+                                  self.bulk_delete, name=self.bulk_delete_routename)
+
+    @abstractmethod
+    @asyncio.coroutine
+    def bulk_create(self, request):
+        pass
+
+    @abstractmethod
+    @asyncio.coroutine
+    def bulk_update(self, request):
+        pass
+
+    @abstractmethod
+    @asyncio.coroutine
+    def bulk_delete(self, request):
+        pass
+
+
 class Resource(CreateMixin,
                UpdateMixin,
                RetrieveMixin,
@@ -110,40 +166,392 @@ class ModelBaseResource(BaseResource):
     trafaret_in = None
     trafaret_out = None
     permissions = []
+    validator_class = ModelValidator
+    serializer_class = ModelSerializer
+    cache = None  # rest_utils.cache backend storing serialized instances
+    etag_column = None  # version/updated_at column name ETags are built from
+    compiled_queries = True  # compile hot path queries once, see rest_utils.queries
+    prepared_statements = False  # execute compiled queries as prepared statements
+    batch_lookups = None  # 'request' or 'app': get_instance goes through DataLoader
+    lookup_fields = None  # key column names, table primary key by default
+    IDENT_SEPARATOR = ','  # separates composite key values in {ident}
 
     def register(self):
         if self.model is None:
             raise Exception('model should be specified for ModelResource')
         if 'db_engine' not in self.app:
             raise Exception('db_engine should be specified in Application')
+        self.lookup_columns = self.get_lookup_columns()
+        self.lookup_trafarets = [GenericFieldValidatorBuilder(column).default_cut(column)
+                                 for column in self.lookup_columns]
+        self.validator.precompile()
+        self.serializer.precompile()
+        self.use_compiled_queries = self.compiled_queries and \
+            is_precompilable(self.model.__table__, self.get_engine().dialect)
+        self.app_loaders = {}
+        if self.cache is not None:  # exported on /metrics, see rest_utils.instrumentation
+            self.app.setdefault('response_caches', {}).setdefault(self.cache, self.singlename)
         super().register()
 
     def get_engine(self):
         return self.app['db_engine']
 
-    def validate(self, instance):
+    def get_connection(self, request):
+        """ Returns connection shared within the request when
+        rest_utils.db.connection_middleware is installed, pool otherwise.
+        Safe methods are routed to app['db_replicas'] if configured.
+        Usage: with (yield from self.get_connection(request)) as conn
+        """
+        if self.use_replica(request):
+            return self.trace_queries(
+                request, request.get('db_replica_connection') or self.app['db_replicas'])
+        replicas = self.app.get('db_replicas')
+        if replicas is not None and request.method not in SAFE_METHODS:
+            replicas.mark_written(self.get_client_key(request))
+        request['db_primary_used'] = True  # further reads see own writes
+        return self.trace_queries(request, request.get('db_connection') or self.get_engine())
+
+    def get_read_engine(self, request):
+        """ Pool for extra read queries running in parallel with the request ones
+        """
+        if self.use_replica(request):
+            return self.trace_queries(request, self.app['db_replicas'])
+        return self.trace_queries(request, self.get_engine())
+
+    def trace_queries(self, request, source):
+        """ Records statements run through connection source into the request
+        query log when slow request capture is enabled (see rest_utils.profiling)
+        """
+        return trace_queries(request, source, self.get_engine().dialect)
+
+    def use_replica(self, request):
+        return self.app.get('db_replicas') is not None and \
+            request.method in SAFE_METHODS and \
+            not request.get('db_primary_used') and \
+            not self.is_sticky(request)
+
+    def is_sticky(self, request):
+        """ Client has written recently and reads from primary
+        """
+        replicas = self.app.get('db_replicas')
+        return replicas is not None and replicas.is_sticky(self.get_client_key(request))
+
+    def get_client_key(self, request):
+        """ Identifies client for sticky-after-write routing
+        """
+        client_id = request.headers.get('X-CLIENT-ID')
+        if client_id:
+            return client_id
+        peername = request.transport.get_extra_info('peername')
+        return peername[0] if peername else None
+
+    @property
+    def codec(self):
+        return app_codec(self.app)
+
+    def get_render_codec(self, request):
+        """ Content negotiation hook: picks codec for the response
+        """
+        return negotiate(request.headers.get('ACCEPT'),
+                         app_render_codecs(self.app))
+
+    def get_body_codec(self, request):
+        """ Picks codec for the request body by its Content-Type
+        """
+        return codec_for_content_type(request.headers.get('CONTENT-TYPE'),
+                                      app_render_codecs(self.app))
+
+    def render(self, request, data, status=http.client.OK, codec=None):
+        """ Renders serialized mapping (or already encoded bytes) into the response
+        """
+        with timed(request, 'encode'):
+            response = EncodedResponse(data,
+                                       codec=codec or self.get_render_codec(request),
+                                       status=status)
+        return self.vary_accept(response)
+
+    def vary_accept(self, response):
+        """ Marks response as negotiated by Accept when app renders more than
+        one format, so shared caches keep a variant per format
+        """
+        if len(app_render_codecs(self.app)) > 1:
+            add_vary(response, 'Accept')
+        return response
+
+    def render_conditional(self, request, body, etag, codec=None):
+        """ Renders encoded body with ETag, honouring If-None-Match.
+        Not Modified carries ETag of the variant client has, which may be
+        the compressed one.
+        """
+        matched = matching_etag(request.headers.get('IF-NONE-MATCH'), etag, weak=True)
+        if matched is not None:
+            response = web.Response(status=http.client.NOT_MODIFIED,
+                                    headers={'ETag': etag if matched == '*' else matched})
+            if app_compressor(self.app) is not None:
+                add_vary(response, 'Accept-Encoding')
+            return self.vary_accept(response)
+        response = self.render(request, body, codec=codec)
+        response.headers['ETag'] = etag
+        return response
+
+    def get_instance_etag(self, instance, codec, body=None, fields=None):
+        """ Builds ETag of instance representation. When etag_column is
+        declared, it's built from column value and the fieldset,
+        and no serialization is needed.
+        """
+        if self.etag_column is not None:
+            version = '{}:{}:{}'.format(codec.name, ','.join(fields or ()),
+                                        instance[self.etag_column])
+            return compute_etag(version.encode())
+        if body is None:
+            body = codec.dumps(self.serialize(instance, fields, codec))
+        return compute_etag(body)
+
+    def serialize(self, instance, fields=None, codec=None):
         try:
-            instance = self.validator.check(instance)
+            instance = self.get_serializer(fields, codec).serialize(instance)
         except DataError as e:
-            raise HTTPBadRequest(text=json.dumps(e.as_dict()))
+            raise self.json_error(HTTPBadRequest, e.as_dict())
         return instance
 
-    def serialize(self, instance):
+    def check_preconditions(self, request, instance):
+        """ Honours If-Match header for optimistic concurrency.
+        The clause is also stored in request['if_match_clause'] for
+        overridden perform_update / perform_delete.
+        :return: WHERE clause for the write, matching the row only while it is
+        the version If-Match was checked against, or None without If-Match
+        """
+        request['if_match_clause'] = clause = self.if_match_clause(request, instance)
+        return clause
+
+    def if_match_clause(self, request, instance):
+        if_match = request.headers.get('IF-MATCH')
+        if if_match is None:
+            return None
+        if instance and if_match.strip() == '*':
+            return None
+        codec = self.get_render_codec(request)
+        if not instance or \
+           not etag_matches(if_match, self.get_instance_etag(instance, codec)):
+            raise self.precondition_failed()
+        return self.version_clause(instance)
+
+    def version_clause(self, instance):
+        """ Compares etag_column, or all columns the ETag is built from
+        without it, with the values of the checked instance
+        """
+        table = self.model.__table__
+        if self.etag_column is not None:
+            names = [self.etag_column]
+        else:
+            names = [name for name in instance.keys() if name in table.c]
+        clauses = []
+        for name in names:
+            value = instance[name]
+            clauses.append(table.c[name].is_(None) if value is None else table.c[name] == value)
+        return and_(*clauses)
+
+    def precondition_failed(self):
+        return self.json_error(HTTPPreconditionFailed, {'etag': 'does not match'})
+
+    def get_cache_key(self, ident, codec):
+        return '{}:{}:{}'.format(self.model.__table__.name, self.format_ident(ident), codec.name)
+
+    @asyncio.coroutine
+    def invalidate_cache(self, *idents):
+        """ Drops cached representations and in-flight app-wide loads of
+        instances. Called by write handlers after perform_* methods, so
+        resources overriding them don't need to.
+        """
+        for loader in self.app_loaders.values():
+            for ident in idents:
+                loader.clear(self.normalize_ident(ident))
+        if self.cache is not None and idents:
+            keys = [self.get_cache_key(ident, codec)
+                    for ident in idents for codec in app_render_codecs(self.app)]
+            compressor = app_compressor(self.app)
+            if compressor is not None:
+                keys += [self.get_compressed_cache_key(key, encoder)
+                         for key in keys for encoder in compressor.encoders]
+            yield from self.cache.delete(*keys)
+
+    def get_compressed_cache_key(self, cache_key, encoder):
+        return '{}:{}'.format(cache_key, encoder.name)
+
+    @asyncio.coroutine
+    def render_cached(self, request, cache_key, body, etag, codec):
+        """ Renders cached body compressed for the client if app has compressor
+        (see rest_utils.compression). Compressed variant is cached next to the body,
+        so repeated hits don't compress again.
+        """
+        response = self.render_conditional(request, body, etag, codec)
+        compressor = app_compressor(self.app)
+        if compressor is None or response.status != http.client.OK or \
+           not compressor.is_compressible(response):
+            return response
+        encoder = compressor.choose(request, len(body))
+        if encoder is None:
+            return response
+        compressed_key = self.get_compressed_cache_key(cache_key, encoder)
+        compressed = yield from self.cache.get(compressed_key)
+        if compressed is None:
+            with timed(request, 'compress'):
+                compressed = yield from compressor.compress(encoder, body)
+            yield from self.cache.set(compressed_key, compressed)
+        compressor.apply(response, encoder, compressed)
+        return response
+
+    def overrides(self, name, mixin):
+        """ Checks if resource overrides method defined in mixin
+        """
+        return getattr(type(self), name) is not getattr(mixin, name)
+
+    def json_error(self, exc_class, data):
+        return exc_class(body=self.codec.dumps(data),
+                         content_type='application/json')
+
+    @asyncio.coroutine
+    def parse_body(self, request):
+        with timed(request, 'parse'):
+            body = yield from request.read()
+            codec = self.get_body_codec(request)
+            try:
+                return codec.loads(body)
+            except ValueError:
+                raise self.json_error(HTTPBadRequest,
+                                      {'body': 'invalid {}'.format(codec.media_type)})
+
+    def validate(self, instance):
         try:
-            instance = self.serializer.serialize(instance)
+            instance = self.validator.check(instance)
         except DataError as e:
-            raise HTTPBadRequest(text=json.dumps(e.as_dict()))
+            raise self.json_error(HTTPBadRequest, e.as_dict())
         return instance
 
+    def get_fields(self, request):
+        """ Parses sparse fieldset from `fields` parameter.
+        :return: tuple of column names in table order or None for all columns
+        """
+        fields = request.GET.get('fields')
+        if not fields:
+            return None
+        requested = set(name.strip() for name in fields.split(',') if name.strip())
+        if not requested:
+            raise self.json_error(HTTPBadRequest, {'fields': 'no fields given'})
+        columns = self.model.__table__.columns
+        unknown = requested.difference(columns.keys())
+        if unknown:
+            raise self.json_error(HTTPBadRequest, {
+                'fields': 'unknown fields: {}'.format(', '.join(sorted(unknown)))})
+        return tuple(name for name in columns.keys() if name in requested)
+
+    def project_query(self, query, fields, extra_columns=()):
+        """ Restricts SELECT to the fieldset and columns needed by resource itself
+        """
+        if fields is None:
+            return query
+        columns = [self.model.__table__.c[name] for name in fields]
+        for column in extra_columns:
+            if column.name not in fields:
+                columns.append(column)
+        return query.with_only_columns(columns)
+
+    def get_serializer(self, fields=None, codec=None):
+        """ Serializer of the fieldset, keeping datetimes native
+        if codec encodes them itself
+        """
+        if codec is not None and codec.native_datetime:
+            return self.serializer_class(self.model, fields=fields, native=True)
+        if fields is None:
+            return self.serializer
+        return self.serializer_class(self.model, fields=fields)
+
+    @asyncio.coroutine
+    def execute_compiled(self, conn, operation, query_factory, params, column_keys=None):
+        """ Executes query compiled once per (resource class, operation, column set).
+        query_factory builds the query with bindparam()s named as params keys;
+        for INSERT/UPDATE column_keys are names of the set columns.
+        """
+        query = query_cache.get((type(self), operation, column_keys), query_factory,
+                                self.get_engine().dialect, column_keys)
+        if self.prepared_statements:
+            return (yield from prepared_statements.execute(conn, query, params))
+        return (yield from conn.execute(query.sql, params))
+
     @asyncio.coroutine
-    def get_instance(self, request, ident):
-        with (yield from self.get_engine()) as conn:
-            result = yield from conn.execute(
-                self.base_query(request).where(self.lookup_key == ident)  # TODO: via metadata??
-            )
+    def fetch_all(self, request, query):
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            result = yield from conn.execute(query)
+            instances = yield from result.fetchall()
+        return instances
+
+    @asyncio.coroutine
+    def get_instance(self, request, ident, fields=None):
+        if fields is None and self.batch_lookups is not None:
+            with timed(request, 'query'):
+                return (yield from self.load_instance(request, ident))
+        extra_columns = []
+        if self.etag_column is not None:
+            extra_columns.append(self.model.__table__.c[self.etag_column])
+
+        def build_query(ident=None):
+            query = self.project_query(self.base_query(request), fields, extra_columns)
+            return query.where(self.lookup_clause(ident))
+
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            if self.use_compiled_queries and \
+               not self.overrides('base_query', ModelBaseResource):
+                result = yield from self.execute_compiled(
+                    conn, 'get', build_query, self.lookup_params(ident), fields)
+            else:
+                result = yield from conn.execute(build_query(ident))
             instance = yield from result.fetchone()
         return instance
 
+    @asyncio.coroutine
+    def load_instance(self, request, ident):
+        """ Loads instance through DataLoader: lookups issued within the same
+        event loop tick are fetched with one `lookup_key IN (...)` query and
+        concurrent lookups of the same ident share one fetch
+        """
+        ident = self.normalize_ident(ident)
+        if ident is None:
+            return None
+        return (yield from self.get_instance_loader(request).load(ident))
+
+    def get_instance_loader(self, request):
+        """ App-wide loader is used for safe requests with batch_lookups = 'app'
+        and request independent base_query, request-scoped one otherwise
+        """
+        if self.batch_lookups == 'app' and request.method in SAFE_METHODS and \
+           not self.overrides('base_query', ModelBaseResource):
+            replica = self.use_replica(request)
+            loader = self.app_loaders.get(replica)
+            if loader is None:
+                engine = self.app['db_replicas'] if replica else self.get_engine()
+                loader = self.app_loaders[replica] = DataLoader(
+                    lambda idents: self.load_instances(None, idents, engine),
+                    loop=self.app.loop)
+            return loader
+        loaders = request.setdefault('instance_loaders', {})
+        loader = loaders.get(self)
+        if loader is None:
+            loader = loaders[self] = DataLoader(
+                lambda idents: self.load_instances(request, idents),
+                loop=self.app.loop)
+        return loader
+
+    @asyncio.coroutine
+    def load_instances(self, request, idents, engine=None):
+        """ Batch load function of instance loaders.
+        :return: mapping of lookup key value to instance
+        """
+        query = self.base_query(request).where(self.lookup_in(idents))
+        with (yield from (engine or self.get_connection(request))) as conn:
+            result = yield from conn.execute(query)
+            instances = yield from result.fetchall()
+        return {self.get_ident(instance): instance for instance in instances}
+
     @property
     def singlename(self):
         return self.model.__name__.lower()
@@ -154,59 +562,222 @@ class ModelBaseResource(BaseResource):
 
     @property
     def validator(self):
-        return ModelValidator(self.model)
+        return self.validator_class(self.model)
 
     @property
     def serializer(self):
-        return ModelSerializer(self.model)
+        return self.serializer_class(self.model)
 
     list_serializer = serializer
 
     def base_query(self, request):
         return self.model.__table__.select()
 
+    def get_lookup_columns(self):
+        """ Key columns instances are looked up by: lookup_fields
+        or primary key of the table
+        """
+        table = self.model.__table__
+        if self.lookup_fields is not None:
+            return tuple(table.c[name] for name in self.lookup_fields)
+        columns = tuple(table.primary_key.columns)
+        if not columns:
+            raise Exception('{} has no primary key, lookup_fields should be specified'.
+                            format(table.name))
+        return columns
+
     @property
     def lookup_key(self):
-        return self.model.__table__.c.id  # TODO: go through columns and find primary key
+        """ Key column, tuple of key columns for composite keys
+        """
+        if len(self.lookup_columns) == 1:
+            return self.lookup_columns[0]
+        return tuple_(*self.lookup_columns)
+
+    @property
+    def lookup_names(self):
+        return tuple(column.name for column in self.lookup_columns)
+
+    @property
+    def composite_key(self):
+        return len(self.lookup_columns) > 1
+
+    @property
+    def ident_route(self):
+        """ {ident} route placeholder matching only well-formed identifiers,
+        composite key values are joined with IDENT_SEPARATOR
+        """
+        patterns = [self.ident_pattern(column) for column in self.lookup_columns]
+        # routes are matched against raw path, where separator may be percent-encoded
+        separator = '(?:{}|{})'.format(re.escape(self.IDENT_SEPARATOR),
+                                       re.escape(quote(self.IDENT_SEPARATOR, safe='')))
+        return '{ident:' + separator.join(patterns) + '}'
+
+    def ident_pattern(self, column):
+        if isinstance(column.type, Integer):
+            return r'-?\d+'
+        if isinstance(column.type, UUID):
+            return r'[0-9a-fA-F-]{32,36}'
+        if self.composite_key:
+            return '[^/' + re.escape(self.IDENT_SEPARATOR) + ']+?'
+        return '[^/]+'
+
+    def normalize_ident(self, ident):
+        """ Converts ident from URL or request body (list for composite keys)
+        to lookup key types, None if it's malformed
+        """
+        if not self.composite_key:
+            values = [ident]
+        elif isinstance(ident, str):
+            values = ident.split(self.IDENT_SEPARATOR)
+        elif isinstance(ident, (list, tuple)):
+            values = ident
+        else:
+            return None
+        if len(values) != len(self.lookup_columns):
+            return None
+        try:
+            values = tuple(check_column_value(column, trafaret, value)
+                           for column, trafaret, value
+                           in zip(self.lookup_columns, self.lookup_trafarets, values))
+        except DataError:
+            return None
+        return values if self.composite_key else values[0]
+
+    def parse_ident(self, request):
+        """ Typed ident of the instance route, malformed one is not found
+        without hitting the database
+        """
+        raw = request.match_info['ident']
+        ident = self.normalize_ident(raw)
+        if ident is None:
+            raise self.json_error(HTTPNotFound, {'id': raw})
+        return ident
+
+    def format_ident(self, ident):
+        if self.composite_key:
+            return self.IDENT_SEPARATOR.join(str(value) for value in ident)
+        return str(ident)
+
+    def get_ident(self, instance):
+        """ Lookup key value of instance, tuple for composite keys
+        """
+        if self.composite_key:
+            return tuple(instance[name] for name in self.lookup_names)
+        return instance[self.lookup_columns[0].name]
+
+    def lookup_clause(self, ident=None):
+        """ WHERE clause matching key columns to ident or, if ident is None,
+        to bind parameters filled by lookup_params
+        """
+        if ident is None:
+            values = [bindparam('lookup_ident_{}'.format(i))
+                      for i in range(len(self.lookup_columns))]
+        else:
+            values = ident if self.composite_key else (ident,)
+        return and_(*[column == value for column, value in zip(self.lookup_columns, values)])
+
+    def lookup_params(self, ident):
+        values = ident if self.composite_key else (ident,)
+        return {'lookup_ident_{}'.format(i): value for i, value in enumerate(values)}
+
+    def lookup_in(self, idents):
+        if self.composite_key:
+            return self.lookup_key.in_([tuple_(*ident) for ident in idents])
+        return self.lookup_key.in_(idents)
 
     @asyncio.coroutine
     def check_permissions(self, request):
-        if not all(p.check(request) for p in self.permissions):
+        """ Runs `check` of all permissions concurrently,
+        results are memoized per request (see rest_utils.permissions)
+        """
+        if not self.permissions:
+            return
+        with timed(request, 'permissions'):
+            permitted = yield from check_all(request, self.permissions)
+        if not permitted:
             raise HTTPForbidden()
 
+    @property
+    def object_permissions(self):
+        return has_object_permissions(self.permissions)
+
+    @asyncio.coroutine
+    def check_object_permissions(self, request, instance):
+        if not self.object_permissions:
+            return
+        ident = self.get_ident(instance)
+        with timed(request, 'permissions'):
+            permitted = yield from check_object_all(request, self.permissions, instance, ident)
+        if not permitted:
+            raise HTTPForbidden()
+
+    @asyncio.coroutine
+    def permitted_query(self, request, query):
+        """ Restricts list query with `filter_queryset` of permissions
+        """
+        if not self.permissions:
+            return query
+        with timed(request, 'permissions'):
+            return (yield from filter_all(request, self.permissions, query))
+
 
 class CreateModelMixin(CreateMixin):
+    """ Creates instance with INSERT ... RETURNING, so created row is
+    available for the response without another query. Resources overriding
+    perform_create get the created row through get_instance, as before.
+    """
     @asyncio.coroutine
     def create(self, request):
         yield from self.check_permissions(request)
-        data = yield from request.json()
-        data = self.validate(data)
+        data = yield from self.parse_body(request)
+        with timed(request, 'validate'):
+            data = self.validate(data)
 
-        created_id = yield from self.perform_create(request, data)
+        if self.overrides('perform_create', CreateModelMixin):
+            created_id = yield from self.perform_create(request, data)
+            instance = None
+        else:
+            instance = yield from self.perform_create_returning(request, data)
+            created_id = self.get_ident(instance)
+        yield from self.invalidate_cache(created_id)
         if hasattr(self, 'get_routename'):
             response = web.Response(
                status=http.client.CREATED)
             created_path = self.app.router[self.get_routename].\
-                url(parts={'ident': created_id})
+                url(parts={'ident': self.format_ident(created_id)})
             location = "{}://{}{}".format(request.scheme, request.host, created_path)
             response.headers.extend({'Location': location})
         else:
-            instance = yield from self.get_instance(request, created_id)
-            data = self.serialize(dict(instance))
-            data.pop('id')  # anyway retrieve method is not allowed
-            response = JSONResponse(
-                data,
-                status=http.client.CREATED)
+            if instance is None:
+                instance = yield from self.get_instance(request, created_id)
+            codec = self.get_render_codec(request)
+            with timed(request, 'serialize'):
+                data = self.serialize(instance, codec=codec)
+            for name in self.lookup_names:  # anyway retrieve method is not allowed
+                data.pop(name, None)
+            response = self.render(request, data, status=http.client.CREATED, codec=codec)
         return response
 
     @asyncio.coroutine
     def perform_create(self, request, data):
-        with (yield from self.get_engine()) as conn:
-            results = yield from conn.execute(
-                self.model.__table__.insert().values(**data)
-            )
-            created_id = yield from results.scalar()
-        return created_id
+        instance = yield from self.perform_create_returning(request, data)
+        return self.get_ident(instance)
+
+    @asyncio.coroutine
+    def perform_create_returning(self, request, data):
+        table = self.model.__table__
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            if self.use_compiled_queries and data:
+                results = yield from self.execute_compiled(
+                    conn, 'create', lambda: table.insert().returning(*table.columns),
+                    data, tuple(sorted(data)))
+            else:
+                results = yield from conn.execute(
+                    table.insert().values(**data).returning(*table.columns)
+                )
+            instance = yield from results.fetchone()
+        return instance
 
     @property
     def create_routename(self):
@@ -214,36 +785,89 @@ class CreateModelMixin(CreateMixin):
 
 
 class UpdateModelMixin(UpdateMixin):
+    """ Updates instance with UPDATE ... RETURNING: missing instance is
+    detected and updated row is returned within the same query.
+    With If-Match the UPDATE matches the row only in the checked version
+    (see version_clause), so concurrent writers with the same ETag can't both
+    succeed: the later one gets 412.
+    Resources overriding perform_update keep the follow-up get_instance and
+    should add request.get('if_match_clause') (None without If-Match) to the
+    WHERE of their write, raising self.precondition_failed() if no row matched.
+    """
     @asyncio.coroutine
     def update(self, request):
         yield from self.check_permissions(request)
-        id_ = request.match_info['ident']
-        data = yield from request.json()
-        data = self.validate(data)
-
-        yield from self.perform_update(request, id_, data)
+        id_ = self.parse_ident(request)
+        data = yield from self.parse_body(request)
+        with timed(request, 'validate'):
+            data = self.validate(data)
+        version = None
+        if 'IF-MATCH' in request.headers or self.object_permissions:
+            instance = yield from self.get_instance(request, id_)
+            if not instance:
+                raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
+            yield from self.check_object_permissions(request, instance)
+            version = self.check_preconditions(request, instance)
+
+        if self.overrides('perform_update', UpdateModelMixin):
+            yield from self.perform_update(request, id_, data)
+            yield from self.invalidate_cache(id_)
+            instance = None
+        else:
+            instance = yield from self.perform_update_returning(request, id_, data, version)
+            yield from self.invalidate_cache(id_)
+            if instance is None and version is not None:
+                raise self.precondition_failed()  # changed or deleted since checked
+            if instance is None:
+                raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
         if hasattr(self, 'get_routename'):
             response = web.Response(
                status=http.client.OK)
             updated_path = self.app.router[self.get_routename].\
-                url(parts={'ident': id_})
+                url(parts={'ident': self.format_ident(id_)})
             location = "{}://{}{}".format(request.scheme, request.host, updated_path)
             response.headers.extend({'Location': location})
         else:
-            instance = yield from self.get_instance(request, id_)
-            data = self.serialize(dict(instance))
-            data.pop('id')  # anyway retrieve method is not allowed
-            response = JSONResponse(
-                data,
-                status=http.client.OK)
+            if instance is None:
+                instance = yield from self.get_instance(request, id_)
+            codec = self.get_render_codec(request)
+            with timed(request, 'serialize'):
+                data = self.serialize(instance, codec=codec)
+            for name in self.lookup_names:  # anyway retrieve method is not allowed
+                data.pop(name, None)
+            response = self.render(request, data, codec=codec)
         return response
 
     @asyncio.coroutine
     def perform_update(self, request, id_, data):
-        with (yield from self.get_engine()) as conn:
-            yield from conn.execute(
-                self.model.__table__.update().where(self.lookup_key == id_).values(**data)
-            )
+        return (yield from self.perform_update_returning(request, id_, data))
+
+    @asyncio.coroutine
+    def perform_update_returning(self, request, id_, data, version=None):
+        """ Returns updated row or None if there is no such instance
+        (or it doesn't match version clause of If-Match)
+        """
+        table = self.model.__table__
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            if version is not None:
+                results = yield from conn.execute(
+                    table.update().where(and_(self.lookup_clause(id_), version)).
+                    values(**data).returning(*table.columns)
+                )
+            elif self.use_compiled_queries and data:
+                params = dict(data, **self.lookup_params(id_))
+                results = yield from self.execute_compiled(
+                    conn, 'update',
+                    lambda: table.update().where(self.lookup_clause()).
+                    returning(*table.columns),
+                    params, tuple(sorted(data)))
+            else:
+                results = yield from conn.execute(
+                    table.update().where(self.lookup_clause(id_)).values(**data).
+                    returning(*table.columns)
+                )
+            instance = yield from results.fetchone()
+        return instance
 
     @property
     def update_routename(self):
@@ -251,21 +875,59 @@ class UpdateModelMixin(UpdateMixin):
 
 
 class RetrieveModelMixin(RetrieveMixin):
+    """ Retrieves single instance with ETag, answering 304 to matching
+    If-None-Match. If resource has `cache` backend, ETag and encoded body
+    are stored there and reused until instance is changed through this resource,
+    as well as compressed variants of the body if app has compressor.
+    Sparse fieldsets (`fields=a,b`) select only requested columns and
+    bypass the cache. With object level permissions the cache is bypassed
+    and full instance is fetched for the check. The cache is bypassed as well
+    when base_query is overridden, as it may differ between requests.
+    With db_replicas the cache is filled from primary reads only, and
+    clients reading their own writes skip it.
+    """
     @asyncio.coroutine
     def get(self, request):
         yield from self.check_permissions(request)
-        ident = request.match_info['ident']
-        instance = yield from self.get_instance(request, ident)
+        ident = self.parse_ident(request)
+        codec = self.get_render_codec(request)
+        fields = self.get_fields(request)
+        object_permissions = self.object_permissions
+        use_cache = self.cache is not None and fields is None and \
+            not object_permissions and not self.overrides('base_query', ModelBaseResource)
+        replica = self.use_replica(request)
+        if use_cache:
+            cache_key = self.get_cache_key(ident, codec)
+        if use_cache and not self.is_sticky(request):
+            with timed(request, 'cache'):
+                cached = yield from self.cache.get(cache_key)
+            if cached is not None:
+                etag, body = cached.split(b'\n', 1)
+                return (yield from self.render_cached(request, cache_key, body,
+                                                      etag.decode(), codec))
+
+        instance = yield from self.get_instance(
+            request, ident, None if object_permissions else fields)
 
         if not instance:
-            raise HTTPNotFound(text=json.dumps({'id': ident}))
-
-        instance = dict(instance)
-        instance = self.serialize(dict(instance))
-        data = json.dumps(instance).encode()
-        return JSONResponse(
-               data,
-               status=http.client.OK)
+            raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
+        yield from self.check_object_permissions(request, instance)
+
+        if self.etag_column is not None:
+            etag = self.get_instance_etag(instance, codec, fields=fields)
+            if etag_matches(request.headers.get('IF-NONE-MATCH'), etag, weak=True):
+                return self.render_conditional(request, None, etag)
+
+        with timed(request, 'serialize'):
+            data = self.serialize(instance, fields, codec)
+        with timed(request, 'encode'):
+            body = codec.dumps(data)
+            etag = self.get_instance_etag(instance, codec, body, fields)
+        if use_cache and not replica:  # replica may lag behind invalidation
+            with timed(request, 'cache'):
+                yield from self.cache.set(cache_key, etag.encode() + b'\n' + body)
+            return (yield from self.render_cached(request, cache_key, body, etag, codec))
+        return self.render_conditional(request, body, etag, codec)
 
     @property
     def get_routename(self):
@@ -273,24 +935,63 @@ class RetrieveModelMixin(RetrieveMixin):
 
 
 class DeleteModelMixin(DeleteMixin):
+    """ Deletes instance detecting missing one from the affected row count.
+    Instance is fetched beforehand only for If-Match checks, object level
+    permissions and for resources overriding perform_delete.
+    With If-Match the DELETE is conditional on the checked version, as update;
+    overridden perform_delete finds the clause in request['if_match_clause'].
+    """
     @asyncio.coroutine
     def delete(self, request):
         yield from self.check_permissions(request)
-        ident = request.match_info['ident']
-        instance = yield from self.get_instance(request, ident)
-
-        if not instance:
-            raise HTTPNotFound(text=json.dumps({'id': ident}))
-
-        yield from self.perform_delete(request, ident)
-        return JSONResponse(status=http.client.OK)
+        ident = self.parse_ident(request)
+        if 'IF-MATCH' in request.headers or self.object_permissions or \
+           self.overrides('perform_delete', DeleteModelMixin):
+            instance = yield from self.get_instance(request, ident)
+
+            if not instance:
+                raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
+            yield from self.check_object_permissions(request, instance)
+            version = self.check_preconditions(request, instance)
+
+            if self.overrides('perform_delete', DeleteModelMixin):
+                yield from self.perform_delete(request, ident)
+                yield from self.invalidate_cache(ident)
+            else:
+                deleted = yield from self.perform_delete(request, ident, version)
+                yield from self.invalidate_cache(ident)
+                if not deleted and version is not None:
+                    raise self.precondition_failed()  # changed or deleted since checked
+                if not deleted:
+                    raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
+        else:
+            deleted = yield from self.perform_delete(request, ident)
+            yield from self.invalidate_cache(ident)
+            if not deleted:
+                raise self.json_error(HTTPNotFound, {'id': request.match_info['ident']})
+        return self.render(request, {})
 
     @asyncio.coroutine
-    def perform_delete(self, request, id_):
-        with (yield from self.get_engine()) as conn:
-            yield from conn.execute(
-                self.model.__table__.delete().where(self.lookup_key == id_)
-            )
+    def perform_delete(self, request, id_, version=None):
+        """ Returns number of deleted rows, rows not matching version clause
+        of If-Match are not deleted
+        """
+        table = self.model.__table__
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            if version is not None:
+                results = yield from conn.execute(
+                    table.delete().where(and_(self.lookup_clause(id_), version))
+                )
+            elif self.use_compiled_queries:
+                results = yield from self.execute_compiled(
+                    conn, 'delete',
+                    lambda: table.delete().where(self.lookup_clause()),
+                    self.lookup_params(id_))
+            else:
+                results = yield from conn.execute(
+                    table.delete().where(self.lookup_clause(id_))
+                )
+        return results.rowcount
 
     @property
     def delete_routename(self):
@@ -298,55 +999,494 @@ class DeleteModelMixin(DeleteMixin):
 
 
 class ListModelMixin(ListMixin):
+    """ Lists model instances page by page, filtered by `filter_fields`
+    (see rest_utils.filters.FilterSet) and ordered by `order_by` column
+    from `ordering_fields` (any column if not declared).
+
+    By default pages are addressed with `offset` and `count`. With
+    cursor_pagination enabled pages are addressed with an opaque `cursor`
+    holding (order_by column, lookup_key) values of the last row on the page,
+    so deep pages are cheap and stable under concurrent inserts.
+    The order_by column is expected to be NOT NULL in cursor mode.
+    """
     page_size = 10
+    cursor_pagination = False
+    export_batch_size = 1000
+    filter_fields = {}
+    ordering_fields = None
+    total_count = None  # rest_utils.counts strategy adding `total` to the page
+    LIST_PARAMS = frozenset(['offset', 'count', 'order_by', 'cursor', 'fields', 'format'])
+
+    def register(self):
+        super().register()
+        table = self.model.__table__
+        self.filterset = FilterSet(table, self.filter_fields)
+        check_indexes(table, self.filterset.fields, 'filterable')
+        if self.ordering_fields is not None:
+            check_indexes(table, self.ordering_fields, 'orderable')
+        self.cursor_trafarets = {}
+        self.app.router.add_route('GET', self.get_path() + '/_export',
+                                  self.export, name=self.export_routename)
 
     @asyncio.coroutine
     def list(self, request):
         yield from self.check_permissions(request)
-        offset = int(request.GET.get('offset', 0))
         limit = int(request.GET.get('count', self.page_size))
-
         order_by = request.GET.get('order_by', '')
-        if order_by:
-            order_column = self.model.__mapper__.columns[order_by.strip('-')]
-            if order_by.startswith('-'):
-                order_column = order_column.desc()
-
-        query = self.base_query(request).offset(offset).limit(limit + 1)
-        if order_by:
-            query = query.order_by(order_column)
-        with (yield from self.get_engine()) as conn:
-            result = yield from conn.execute(query)
-            instances = yield from result.fetchall()
+        if self.cursor_pagination:
+            query, query_params = self.paginate_cursor(request, order_by)
+        else:
+            query, query_params = self.paginate_offset(request, order_by)
+        query = query.limit(limit + 1)
+        query, filter_params = self.filter_query(request, query)
+        query = yield from self.permitted_query(request, query)
+        query_params.update(filter_params)
+        fields = self.get_fields(request)
+        codec = self.get_render_codec(request)
+        if fields is not None:
+            query = self.project_query(query, fields, self.get_cursor_columns(order_by))
+            query_params['fields'] = ','.join(fields)
+        if fields is not None or codec.native_datetime:
+            serializer = self.get_serializer(fields, codec)
+        else:
+            serializer = self.list_serializer
+
+        if self.total_count is not None:
+            count_query, _ = self.filter_query(request, self.base_query(request))
+            count_query = yield from self.permitted_query(request, count_query)
+            with timed(request, 'query'):
+                instances, total = yield from asyncio.gather(
+                    self.fetch_all(request, query),
+                    self.total_count.count(self, request, count_query),
+                    loop=self.app.loop)
+        else:
+            instances = yield from self.fetch_all(request, query)
 
         has_next = len(instances) > limit
         if has_next:
             del instances[-1]
-        page = [self.list_serializer.serialize(dict(instance))
-                for instance in instances]
+        with timed(request, 'serialize'):
+            page = serializer.serialize_many(instances)
 
         data = {self.pluralname: page,
                 'has_next': has_next,
-                'count': len(page),
-                'offset': offset}
+                'count': len(page)}
+        if self.total_count is not None:
+            data['total'] = total
+        if 'offset' in query_params:
+            data['offset'] = query_params['offset']
         if has_next:
-            next_path = self.app.router[self.list_routename].\
-                url(query={'count': limit, 'offset': offset + limit})
+            if self.cursor_pagination:
+                query_params['cursor'] = self.encode_cursor(order_by, page[-1], instances[-1])
+            else:
+                query_params['offset'] += limit
+            query_params['count'] = limit
+            next_path = self.app.router[self.list_routename].url(query=query_params)
             next_url = "{}://{}{}".format(request.scheme, request.host, next_path)
             data.update({'next': next_url})
-        return JSONResponse(
-               data,
-               status=http.client.OK)
+        with timed(request, 'encode'):
+            body = codec.dumps(data)
+            etag = compute_etag(body)
+        return self.render_conditional(request, body, etag, codec)
+
+    def filter_query(self, request, query):
+        """ Applies filters from query string.
+        :return: filtered query and filter parameters for next page links
+        """
+        if not self.filterset:
+            return query, {}
+        try:
+            filters = self.filterset.parse(request.GET, ignore=self.LIST_PARAMS)
+        except DataError as e:
+            raise self.json_error(HTTPBadRequest, e.as_dict())
+        filter_params = {key: value for key, value in request.GET.items()
+                         if key not in self.LIST_PARAMS}
+        return self.filterset.apply(query, filters), filter_params
+
+    def get_order_column(self, order_by):
+        """ Resolves order_by parameter to (column, descending)
+        """
+        if self.ordering_fields is not None and \
+           order_by.strip('-') not in self.ordering_fields:
+            raise self.json_error(HTTPBadRequest, {'order_by': 'ordering is not allowed'})
+        try:
+            column = self.model.__mapper__.columns[order_by.strip('-')]
+        except KeyError:
+            raise self.json_error(HTTPBadRequest, {'order_by': 'unknown column'})
+        return column, order_by.startswith('-')
+
+    def paginate_offset(self, request, order_by):
+        offset = int(request.GET.get('offset', 0))
+        query = self.base_query(request).offset(offset)
+        if order_by:
+            order_column, descending = self.get_order_column(order_by)
+            query = query.order_by(order_column.desc() if descending else order_column)
+        query_params = {'offset': offset}
+        if order_by:
+            query_params['order_by'] = order_by
+        return query, query_params
+
+    def get_cursor_columns(self, order_by):
+        """ Columns identifying row position: order_by column and lookup_key
+        """
+        columns = list(self.lookup_columns)
+        if order_by:
+            order_column, _ = self.get_order_column(order_by)
+            if order_column.name not in self.lookup_names:
+                columns.insert(0, order_column)
+        return columns
+
+    def paginate_cursor(self, request, order_by):
+        columns = self.get_cursor_columns(order_by)
+        descending = order_by.startswith('-')
+
+        query = self.base_query(request).order_by(
+            *[column.desc() if descending else column for column in columns])
+
+        cursor = request.GET.get('cursor')
+        if cursor:
+            values = self.decode_cursor(cursor, columns)
+            if len(columns) > 1:
+                position, values = tuple_(*columns), tuple_(*values)
+            else:
+                position, values = columns[0], values[0]
+            query = query.where(position < values if descending else position > values)
+
+        query_params = {}
+        if order_by:
+            query_params['order_by'] = order_by
+        return query, query_params
+
+    def encode_cursor(self, order_by, item, instance):
+        names = [column.name for column in self.get_cursor_columns(order_by)]
+        values = [item[name] if name in item else instance[name] for name in names]
+        values = [value.isoformat() if isinstance(value, datetime.datetime) else value
+                  for value in values]
+        return base64.urlsafe_b64encode(self.codec.dumps(values)).decode('ascii')
+
+    def decode_cursor(self, cursor, columns):
+        """ Decodes cursor values converting them to column types,
+        cursor is client supplied and may be tampered with
+        """
+        try:
+            values = self.codec.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError):
+            values = None
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise self.json_error(HTTPBadRequest, {'cursor': 'malformed cursor'})
+        checked = []
+        for column, value in zip(columns, values):
+            try:
+                checked.append(check_column_value(
+                    column, self.get_cursor_trafaret(column), value))
+            except DataError:
+                raise self.json_error(HTTPBadRequest, {'cursor': 'malformed cursor'})
+        return checked
+
+    def get_cursor_trafaret(self, column):
+        trafaret = self.cursor_trafarets.get(column.name)
+        if trafaret is None:
+            try:
+                trafaret = GenericFieldValidatorBuilder(column).default_cut(column)
+            except NotImplementedError:  # type without trafaret, let database check it
+                trafaret = t.Any()
+            self.cursor_trafarets[column.name] = trafaret
+        return trafaret
+
+    @asyncio.coroutine
+    def export(self, request):
+        """ Streams all instances as chunked JSON array or NDJSON
+        (`format=ndjson` or `Accept: application/x-ndjson`).
+        Rows are read through server-side cursor in export_batch_size batches,
+        so memory is bounded regardless of table size.
+        """
+        yield from self.check_permissions(request)
+        ndjson = request.GET.get('format') == 'ndjson' or \
+            'application/x-ndjson' in request.headers.get('ACCEPT', '')
+        query, _ = self.filter_query(request, self.base_query(request))
+        query = yield from self.permitted_query(request, query)
+        order_by = request.GET.get('order_by', '')
+        if order_by:
+            order_column, descending = self.get_order_column(order_by)
+            query = query.order_by(order_column.desc() if descending else order_column)
+
+        response = web.StreamResponse(status=http.client.OK)
+        if ndjson:
+            response.content_type = 'application/x-ndjson'
+        else:
+            response.content_type = 'application/json'
+        add_vary(response, 'Accept')
+        response.enable_chunked_encoding()
+        response.start(request)
+
+        dumps = self.codec.dumps
+        if not ndjson:
+            response.write(b'[')
+        first = True
+        with (yield from self.get_connection(request)) as conn:
+            compiled = query.compile(dialect=self.get_engine().dialect)
+            transaction = yield from conn.begin()
+            try:
+                yield from conn.execute(
+                    'DECLARE export_cursor NO SCROLL CURSOR FOR ' + str(compiled),
+                    compiled.params)
+                while True:
+                    with timed(request, 'query'):
+                        result = yield from conn.execute(
+                            'FETCH FORWARD {:d} FROM export_cursor'.format(
+                                self.export_batch_size))
+                        instances = yield from result.fetchall()
+                    if not instances:
+                        break
+                    with timed(request, 'serialize'):
+                        page = self.list_serializer.serialize_many(instances)
+                    with timed(request, 'encode'):
+                        if ndjson:
+                            chunk = b''.join(dumps(item) + b'\n' for item in page)
+                        else:
+                            chunk = b','.join(dumps(item) for item in page)
+                            if not first:
+                                chunk = b',' + chunk
+                    first = False
+                    response.write(chunk)
+                    yield from response.drain()
+                yield from conn.execute('CLOSE export_cursor')
+            finally:
+                yield from transaction.rollback()  # read only, nothing to commit
+        if not ndjson:
+            response.write(b']')
+        yield from response.write_eof()
+        return response
 
     @property
     def list_routename(self):
         return '{}-list'.format(self.singlename)
 
+    @property
+    def export_routename(self):
+        return '{}-export'.format(self.singlename)
+
+
+class BulkModelMixin(BulkMixin):
+    """ Creates, updates and deletes many instances in one transaction.
+
+    POST <path>/_bulk takes array of objects and inserts them with multi-row
+    INSERT ... RETURNING. PATCH <path>/_bulk takes array of objects with
+    lookup key and applies them with UPDATE ... FROM (VALUES ...).
+    DELETE <path>/_bulk takes array of ids and runs DELETE ... WHERE id IN (...).
+    Whole array is validated first; response holds status of every item.
+    With object permissions, targets of update and delete are loaded and
+    checked first, denied items are skipped and reported with 403.
+    """
+    bulk_max_items = 1000
+
+    @asyncio.coroutine
+    def parse_bulk_body(self, request):
+        items = yield from self.parse_body(request)
+        if not isinstance(items, list):
+            raise self.json_error(HTTPBadRequest, {'body': 'array expected'})
+        if len(items) > self.bulk_max_items:
+            raise self.json_error(HTTPBadRequest, {
+                'body': 'at most {} items allowed'.format(self.bulk_max_items)})
+        return items
+
+    def validate_many(self, items, with_key=False):
+        """ Validates every item, raises HTTPBadRequest with errors of all
+        invalid items keyed by their index
+        """
+        validated, errors = [], {}
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise DataError('value is not a dict')
+                if with_key:
+                    data = self.validator.check(
+                        {name: value for name, value in item.items()
+                         if name not in self.lookup_names})
+                    for column, trafaret in zip(self.lookup_columns, self.lookup_trafarets):
+                        data[column.name] = check_column_value(
+                            column, trafaret, item.get(column.name))
+                else:
+                    data = self.validator.check(item)
+            except DataError as e:
+                errors[index] = e.as_dict()
+                continue
+            validated.append(data)
+        if errors:
+            raise self.json_error(HTTPBadRequest, errors)
+        return validated
+
+    def bulk_result(self, request, ids, found_ids, status, forbidden_ids=()):
+        items = []
+        for ident in ids:
+            if ident in forbidden_ids:
+                items.append({'id': ident, 'status': http.client.FORBIDDEN})
+            elif ident in found_ids:
+                items.append({'id': ident, 'status': status})
+            else:
+                items.append({'id': ident, 'status': http.client.NOT_FOUND})
+        return self.render(request, {'items': items})
+
+    @asyncio.coroutine
+    def forbidden_idents(self, request, idents):
+        """ Loads instances and runs object permissions on them
+        :return: set of lookup keys of instances access is denied to
+        """
+        if not self.object_permissions or not idents:
+            return set()
+        with timed(request, 'query'):
+            instances = yield from self.load_instances(request, idents)
+        with timed(request, 'permissions'):
+            idents = list(instances)
+            permitted = yield from asyncio.gather(
+                *[check_object_all(request, self.permissions, instances[ident], ident)
+                  for ident in idents],
+                loop=self.app.loop)
+        return set(ident for ident, allowed in zip(idents, permitted) if not allowed)
+
+    @asyncio.coroutine
+    def bulk_create(self, request):
+        yield from self.check_permissions(request)
+        items = yield from self.parse_bulk_body(request)
+        with timed(request, 'validate'):
+            items = self.validate_many(items)
+        created_ids = yield from self.perform_bulk_create(request, items)
+        yield from self.invalidate_cache(*created_ids)
+        return self.bulk_result(request, created_ids, set(created_ids),
+                                http.client.CREATED)
+
+    @asyncio.coroutine
+    def bulk_update(self, request):
+        yield from self.check_permissions(request)
+        items = yield from self.parse_bulk_body(request)
+        with timed(request, 'validate'):
+            items = self.validate_many(items, with_key=True)
+        ids = [self.get_ident(item) for item in items]
+        forbidden_ids = yield from self.forbidden_idents(request, ids)
+        updated_ids = yield from self.perform_bulk_update(
+            request, [item for item in items if self.get_ident(item) not in forbidden_ids])
+        yield from self.invalidate_cache(*updated_ids)
+        return self.bulk_result(request, ids, set(updated_ids), http.client.OK, forbidden_ids)
+
+    @asyncio.coroutine
+    def bulk_delete(self, request):
+        yield from self.check_permissions(request)
+        ids = yield from self.parse_bulk_body(request)
+        ids = [self.normalize_ident(ident) for ident in ids]
+        errors = {index: 'malformed identifier'
+                  for index, ident in enumerate(ids) if ident is None}
+        if errors:
+            raise self.json_error(HTTPBadRequest, errors)
+        forbidden_ids = yield from self.forbidden_idents(request, ids)
+        deleted_ids = yield from self.perform_bulk_delete(
+            request, [ident for ident in ids if ident not in forbidden_ids])
+        yield from self.invalidate_cache(*deleted_ids)
+        return self.bulk_result(request, ids, set(deleted_ids), http.client.OK, forbidden_ids)
+
+    @asyncio.coroutine
+    def execute_in_transaction(self, request, queries):
+        """ Executes queries in one transaction, returns lookup keys
+        from their RETURNING clauses
+        """
+        ids = []
+        with timed(request, 'query'), (yield from self.get_connection(request)) as conn:
+            transaction = yield from conn.begin()
+            try:
+                for query in queries:
+                    result = yield from conn.execute(query)
+                    rows = yield from result.fetchall()
+                    ids.extend(self.get_ident(row) for row in rows)
+            except Exception:
+                yield from transaction.rollback()
+                raise
+            yield from transaction.commit()
+        return ids
+
+    @asyncio.coroutine
+    def perform_bulk_create(self, request, items):
+        table = self.model.__table__
+        groups = OrderedDict()  # multi-row VALUES needs same columns in every row
+        for item in items:
+            groups.setdefault(tuple(sorted(item)), []).append(item)
+        queries = []
+        for columns, group in groups.items():
+            if columns:
+                queries.append(table.insert().values(group).returning(*self.lookup_columns))
+            else:
+                queries.extend(table.insert().returning(*self.lookup_columns) for _ in group)
+        return (yield from self.execute_in_transaction(request, queries))
+
+    @asyncio.coroutine
+    def perform_bulk_update(self, request, items):
+        groups = OrderedDict()
+        for item in items:
+            columns = tuple(sorted(name for name in item if name not in self.lookup_names))
+            groups.setdefault(columns, []).append(item)
+        queries = [self.bulk_update_query(columns, group)
+                   for columns, group in groups.items() if columns]
+        if () in groups:  # nothing to update, but existing rows are reported as updated
+            idents = [self.get_ident(item) for item in groups[()]]
+            queries.append(select(self.lookup_columns).where(self.lookup_in(idents)))
+        return (yield from self.execute_in_transaction(request, queries))
+
+    def bulk_update_query(self, columns, items):
+        """ Builds UPDATE ... FROM (VALUES ...) RETURNING lookup_key
+        """
+        dialect = self.get_engine().dialect
+        quote = dialect.identifier_preparer.quote
+        table = self.model.__table__
+        names = self.lookup_names + columns
+        types = [table.c[name].type.compile(dialect=dialect) for name in names]
+        params, rows = {}, []
+        for i, item in enumerate(items):
+            placeholders = []
+            for j, name in enumerate(names):
+                param = 'bulk_{}_{}'.format(i, j)
+                params[param] = item[name]
+                placeholders.append('CAST(:{} AS {})'.format(param, types[j]))
+            rows.append('({})'.format(', '.join(placeholders)))
+        table_name = dialect.identifier_preparer.format_table(table)
+        keys = [quote(name) for name in self.lookup_names]
+        sql = 'UPDATE {table} SET {assignments} ' \
+              'FROM (VALUES {rows}) AS bulk_values ({names}) ' \
+              'WHERE {condition} ' \
+              'RETURNING {returning}'.format(
+                  table=table_name,
+                  assignments=', '.join('{0} = bulk_values.{0}'.format(quote(name))
+                                        for name in columns),
+                  rows=', '.join(rows),
+                  names=', '.join(quote(name) for name in names),
+                  condition=' AND '.join('{0}.{1} = bulk_values.{1}'.format(table_name, key)
+                                         for key in keys),
+                  returning=', '.join('{}.{}'.format(table_name, key) for key in keys))
+        return text(sql).bindparams(**params)
+
+    @asyncio.coroutine
+    def perform_bulk_delete(self, request, ids):
+        if not ids:
+            return []
+        query = self.model.__table__.delete().\
+            where(self.lookup_in(ids)).returning(*self.lookup_columns)
+        return (yield from self.execute_in_transaction(request, [query]))
+
+    @property
+    def bulk_create_routename(self):
+        return '{}-bulk-create'.format(self.singlename)
+
+    @property
+    def bulk_update_routename(self):
+        return '{}-bulk-update'.format(self.singlename)
+
+    @property
+    def bulk_delete_routename(self):
+        return '{}-bulk-delete'.format(self.singlename)
+
 
 class ModelResource(CreateModelMixin,
                     UpdateModelMixin,
                     RetrieveModelMixin,
                     DeleteModelMixin,
                     ListModelMixin,
+                    BulkModelMixin,
                     ModelBaseResource):
     pass
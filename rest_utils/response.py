@@ -1,13 +1,36 @@
-import json
 from aiohttp.web import Response
+from rest_utils.codecs import default_codec
+
+
+class EncodedResponse(Response):
+    """ Response with body encoded by the codec exactly once
+    """
+    def __init__(self, data=None, codec=None, **kwargs):
+        codec = codec or default_codec
+        if data is None:
+            data = {}
+        if not isinstance(data, bytes):
+            data = codec.dumps(data)
+        super().__init__(body=data, content_type=codec.content_type, **kwargs)
+
+
+def add_vary(response, header):
+    """ Appends header to Vary of the response, unless it's already there
+    """
+    vary = response.headers.get('VARY')
+    if not vary:
+        response.headers['Vary'] = header
+    elif header.lower() not in [name.strip().lower() for name in vary.split(',')]:
+        response.headers['Vary'] = vary + ', ' + header
 
 
 class JSONResponse(Response):
     def __init__(self, body=None,
                  content_type='application/json; charset=utf-8',
+                 codec=None,
                  **kwargs):
         if body is None:
             body = {}
-        if isinstance(body, dict):
-            body = json.dumps(body).encode()
+        if isinstance(body, (dict, list)):
+            body = (codec or default_codec).dumps(body)
         super().__init__(body=body, content_type=content_type, **kwargs)
@@ -0,0 +1,144 @@
+""" Pre-fork server: master process forks workers, every worker builds its own
+Application (and so its own database pools) and listens on the same port
+with SO_REUSEPORT, so kernel balances connections between them.
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def install_uvloop():
+    """ Makes uvloop default event loop if it is installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+class Worker:
+    """ Serves Application built by app_factory until SIGTERM/SIGINT.
+    On shutdown stops accepting connections, gives in-flight requests
+    shutdown_timeout seconds to complete and runs app.finish(),
+    where database pools are closed.
+    """
+
+    def __init__(self, app_factory, host, port, shutdown_timeout=10.0):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.shutdown_timeout = shutdown_timeout
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = self.app_factory()
+        handler = app.make_handler()
+        server = loop.run_until_complete(
+            loop.create_server(handler, self.host, self.port, reuse_port=True))
+        stopping = asyncio.Future(loop=loop)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, lambda: stopping.done() or stopping.set_result(None))
+        logger.info('Worker %d serving on http://%s:%d', os.getpid(), self.host, self.port)
+        try:
+            loop.run_until_complete(stopping)
+        finally:
+            loop.run_until_complete(self.shutdown(app, handler, server))
+            loop.close()
+
+    @asyncio.coroutine
+    def shutdown(self, app, handler, server):
+        server.close()
+        yield from server.wait_closed()
+        yield from handler.finish_connections(self.shutdown_timeout)
+        yield from app.finish()
+        logger.info('Worker %d stopped', os.getpid())
+
+
+class Master:
+    """ Forks workers and keeps their number, restarting crashed ones.
+    Worker crashing within restart_delay seconds after start is restarted
+    with increasing delay, so a broken deployment doesn't fork in a loop.
+    SIGTERM/SIGINT are forwarded to workers for graceful shutdown.
+    """
+
+    def __init__(self, worker, workers=None, restart_delay=1.0):
+        self.worker = worker
+        self.workers = workers or os.cpu_count() or 1
+        self.restart_delay = restart_delay
+        self.pids = {}  # pid -> start time
+        self.stopping = False
+        self.restarts = 0
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        delay = self.restart_delay
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            started = self.pids.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            if os.WIFSIGNALED(status):
+                logger.warning('Worker %d killed by signal %d, restarting',
+                               pid, os.WTERMSIG(status))
+            else:
+                logger.warning('Worker %d exited with code %d, restarting',
+                               pid, os.WEXITSTATUS(status))
+            if time.monotonic() - started < self.restart_delay:
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+            else:
+                delay = self.restart_delay
+            self.restarts += 1
+            self.spawn()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = time.monotonic()
+            return
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        status = 0
+        try:
+            self.worker.run()
+        except Exception:
+            logger.exception('Worker %d failed', os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def serve(app_factory, host='127.0.0.1', port=8080, workers=None,
+          shutdown_timeout=10.0, uvloop=True):
+    """ Runs app_factory() Application in `workers` processes
+    (number of CPUs by default). app_factory is called in every worker
+    after fork and should build Application on the current event loop.
+    """
+    if uvloop and install_uvloop():
+        logger.info('Using uvloop')
+    worker = Worker(app_factory, host, port, shutdown_timeout)
+    Master(worker, workers).run()
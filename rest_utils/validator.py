@@ -1,6 +1,11 @@
+import datetime
+import uuid
+from collections import OrderedDict
 import sqlalchemy.sql.sqltypes
 import trafaret as t
-from trafaret.contrib.rfc_3339 import DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from dateutil.parser import parse as parse_datetime
+from trafaret.contrib.rfc_3339 import DateTime as RFC3339DateTime
 
 
 class BaseFieldBuilder:
@@ -49,8 +54,13 @@ class GenericFieldValidatorBuilder(BaseFieldBuilder):
     def _bool_col(self, column, **kwargs):
         return t.StrBool(**kwargs)
 
+    def _uuid_col(self, column, **kwargs):
+        return (t.Type(uuid.UUID) | t.String(**kwargs) >> _parse_uuid) >> str
+
     def default_cut(self, column, **kwargs):
-        if isinstance(column.type, sqlalchemy.sql.sqltypes.Enum):
+        if isinstance(column.type, UUID):
+            trafaret = self._uuid_col(column, **kwargs)
+        elif isinstance(column.type, sqlalchemy.sql.sqltypes.Enum):
             trafaret = self._enum_col(column, **kwargs)
         elif isinstance(column.type, sqlalchemy.sql.sqltypes.String):
             trafaret = self._str_col(column, **kwargs)
@@ -65,6 +75,30 @@ class GenericFieldValidatorBuilder(BaseFieldBuilder):
         return trafaret
 
 
+_NO_DEFAULT = t.Key('').default  # trafaret sentinel of key without default
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise t.DataError('value is not a UUID')
+
+
+class DateTime(RFC3339DateTime):
+    """ RFC3339 DateTime failing with DataError on unparsable strings,
+    trafaret's one reads missing `e.message` and raises AttributeError
+    """
+
+    def converter(self, value):
+        if isinstance(value, datetime.datetime):
+            return value
+        try:
+            return parse_datetime(value)
+        except (ValueError, OverflowError):
+            self._failure('value is not a datetime')
+
+
 class NullableFieldBuilder(BaseFieldBuilder):
     """ Treats empty value as NULL
     """
@@ -88,19 +122,108 @@ class NullableFieldBuilder(BaseFieldBuilder):
 
 
 class PrimaryKeySkipper(BaseFieldBuilder):
-    """ Treats empty value as NULL
+    """ Skips key column generated by the database
     """
     def build_trafaret(self, trafaret, kwargs):
-        if self.column.primary_key and self.column.autoincrement:
+        if is_generated_key(self.column):
             return None
         return trafaret
 
 
+def is_generated_key(column):
+    """ Primary key column with a default or a serial one,
+    columns of composite keys are serial only if they have a default
+    """
+    if not column.primary_key:
+        return False
+    if column.default is not None or column.server_default is not None:
+        return True
+    return column.autoincrement and len(column.table.primary_key.columns) == 1 and \
+        isinstance(column.type, sqlalchemy.sql.sqltypes.Integer) and not column.foreign_keys
+
+
+def check_column_value(column, trafaret, value):
+    """ Checks client supplied value of column, booleans are rejected
+    for non-boolean columns as trafaret.Int accepts them
+    """
+    if isinstance(value, bool) and \
+            not isinstance(column.type, sqlalchemy.sql.sqltypes.Boolean):
+        raise t.DataError('value is not {}'.format(column.type))
+    return trafaret.check(value)
+
+
 class GenericFieldSerializerBuilder(GenericFieldValidatorBuilder):
     def _datetime_col(self, column, **kwargs):
         return super()._datetime_col(column, **kwargs) >> (lambda dt: dt.isoformat())
 
 
+class NativeFieldSerializerBuilder(GenericFieldSerializerBuilder):
+    """ Keeps datetimes as is for codecs encoding them natively
+    """
+    def _datetime_col(self, column, **kwargs):
+        return GenericFieldValidatorBuilder._datetime_col(self, column, **kwargs)
+
+
+class TrafaretRegistry:
+    """ Keeps trafarets compiled by model validators, so the schema
+    is built once per (validator class, model) instead of on every check.
+
+    Counters `compiled` and `hits` show how often the registry had
+    to build a trafaret and how often the compiled one was reused.
+
+    Keys include client-supplied fieldsets, so at most `max_size`
+    trafarets are kept, least recently used ones are evicted.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._trafarets = OrderedDict()
+        self.compiled = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(self, key, factory):
+        """ Returns trafaret stored under the key, building it with factory
+        on the first request.
+        :param key: tuple starting with (validator class, model, fields)
+        """
+        try:
+            trafaret = self._trafarets[key]
+        except KeyError:
+            trafaret = self._trafarets[key] = factory()
+            self.compiled += 1
+            while len(self._trafarets) > self.max_size:
+                self._trafarets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._trafarets.move_to_end(key)
+            self.hits += 1
+        return trafaret
+
+    def invalidate(self, validator_class=None, model=None):
+        """ Drops compiled trafarets. Without arguments drops everything,
+        otherwise only entries matching given validator class and/or model.
+        """
+        if validator_class is None and model is None:
+            self._trafarets.clear()
+            return
+        for key in list(self._trafarets):
+            if validator_class is not None and key[0] is not validator_class:
+                continue
+            if model is not None and key[1] is not model:
+                continue
+            del self._trafarets[key]
+
+    def stats(self):
+        return {'compiled': self.compiled,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'size': len(self._trafarets)}
+
+
+registry = TrafaretRegistry()
+
+
 class ModelValidator:
     """ Data Validator for SQLAlchemy model. Generates Trafaret by the model definition.
 
@@ -115,13 +238,21 @@ class ModelValidator:
 
         def cut_provider(self, column, **kwargs):
             pass  # skip field
+
+    If fields are given, trafaret is generated only for these model fields.
+
+    Generated trafaret is compiled once per (validator class, model, fields)
+    and kept in `registry`. If trafaret depends on validator instance state,
+    set CACHE_TRAFARET to False or extend `cache_key`.
     """
     SKIP_PRIMARY_KEY = True # assume we have clean data without id field
                             # if not, you can set this to False in the child
     GENERIC_FIELD_TRAFARET_BUILDER = GenericFieldValidatorBuilder
+    CACHE_TRAFARET = True
 
-    def __init__(self, model):
+    def __init__(self, model, fields=None):
         self._model = model
+        self._only = fields
 
     def get_builders(self, column):
         builders =  [self.GENERIC_FIELD_TRAFARET_BUILDER(column), NullableFieldBuilder(column)]
@@ -129,20 +260,57 @@ class ModelValidator:
             builders += [PrimaryKeySkipper(column)]
         return builders
 
+    @property
+    def cache_key(self):
+        return type(self), self._model, self._only
+
+    def _compiled(self, kind, factory):
+        if self.CACHE_TRAFARET:
+            return registry.get(self.cache_key + (kind,), factory)
+        return factory()
+
     @property
     def _validator(self):
+        return self._compiled('dict', self.compile)
+
+    @property
+    def _fields(self):
+        return self._compiled('fields', self.compile_fields)
+
+    def precompile(self):
+        """ Builds the trafaret ahead of the first check
+        """
+        self._validator
+
+    def invalidate(self):
+        """ Drops compiled trafaret of this validator class and model
+        """
+        registry.invalidate(type(self), self._model)
+
+    def compile_fields(self):
+        """ Generates trafaret for every model field
+        :return: list of (trafaret.Key, trafaret) pairs
+        """
         if self._model is None:
             raise t.DataError('ModelValidator is not associated with model')
 
-        fields = {}
+        fields = []
         for column in self._model.__table__.columns.values():
+            if self._only is not None and column.name not in self._only:
+                continue
             key = t.Key(column.name, **self.key_kwargs(column))
             trafaret = self.cut(column, **self.val_kwargs(column))
 
             if trafaret is None:  # chain node can return None to skip field
                 continue
-            fields[key] = trafaret
-        return t.Dict(fields)
+            fields.append((key, trafaret))
+        return fields
+
+    def compile(self):
+        """ Generates Trafaret by the model definition
+        :return: trafaret.Dict
+        """
+        return t.Dict(dict(self._fields))
 
     def check(self, instance):
         """
@@ -190,8 +358,138 @@ class ModelValidator:
 
 
 class ModelSerializer(ModelValidator):
+    """ Serializer for SQLAlchemy model rows.
+
+    With TRUSTED_OUTPUT enabled rows are expected to come from our own
+    database, so instead of the generic trafaret check a function specialized
+    for the model is generated: values are read directly, datetimes and UUIDs
+    are converted inline and no errors are accumulated. Fields having
+    cut_<fieldname>, val_kwargs_<fieldname> or key_kwargs_<fieldname> overrides
+    still go through their trafaret.
+
+    With native enabled datetimes are kept as datetime objects for codecs
+    encoding them natively (see rest_utils.codecs.MsgpackCodec).
+    """
     SKIP_PRIMARY_KEY = False
     GENERIC_FIELD_TRAFARET_BUILDER = GenericFieldSerializerBuilder
+    NATIVE_FIELD_TRAFARET_BUILDER = NativeFieldSerializerBuilder
+    TRUSTED_OUTPUT = False
+
+    def __init__(self, model, fields=None, native=False):
+        super().__init__(model, fields)
+        self._native = native
+
+    @property
+    def cache_key(self):
+        return super().cache_key + (self._native,)
+
+    def get_builders(self, column):
+        builders = super().get_builders(column)
+        if self._native and type(builders[0]) is GenericFieldSerializerBuilder:
+            builders[0] = self.NATIVE_FIELD_TRAFARET_BUILDER(column)
+        return builders
+
+    @property
+    def _trusted_serializer(self):
+        return self._compiled('trusted', self.compile_trusted)
+
+    def is_plain_field(self, column):
+        """ Checks if field is serialized by the generic builders only
+        """
+        if type(self).GENERIC_FIELD_TRAFARET_BUILDER is not GenericFieldSerializerBuilder:
+            return False
+        for prefix in ('cut_', 'val_kwargs_', 'key_kwargs_'):
+            if hasattr(self, prefix + column.name):
+                return False
+        return True
+
+    def compile_trusted(self):
+        """ Generates serialization function for the model
+        :return: function row -> dict
+        """
+        columns = self._model.__table__.columns
+        namespace = {}
+        lines = ['def serialize(row):']
+        items = []
+        for i, (key, trafaret) in enumerate(self._fields):
+            column = columns[key.name]
+            value = 'row[{!r}]'.format(key.name)
+            if not self.is_plain_field(column):
+                namespace['check_{}'.format(i)] = trafaret.check
+                value = 'check_{}({})'.format(i, value)
+            elif isinstance(column.type, sqlalchemy.sql.sqltypes.DateTime) and \
+                    not self._native:
+                lines.append('    v{} = {}'.format(i, value))
+                value = 'None if v{0} is None else v{0}.isoformat()'.format(i)
+            elif isinstance(column.type, UUID):
+                lines.append('    v{} = {}'.format(i, value))
+                value = 'None if v{0} is None else str(v{0})'.format(i)
+            items.append('        {!r}: {},'.format(key.get_name(), value))
+        lines += ['    return {'] + items + ['    }']
+        exec('\n'.join(lines), namespace)
+        return namespace['serialize']
+
+    def precompile(self):
+        super().precompile()
+        if self.TRUSTED_OUTPUT:
+            self._trusted_serializer
 
     def serialize(self, instance):
-        return self.check(instance)
+        """ Serializes single row, no copy into dict is needed
+        :param instance: mapping (e.g. aiopg RowProxy)
+        :return: dict
+        """
+        if self.TRUSTED_OUTPUT:
+            try:
+                return self._trusted_serializer(instance)
+            except KeyError:  # row lacks a column, e.g. base_query selects a subset
+                pass
+        return self.check_many((instance,))[0]
+
+    def serialize_many(self, rows):
+        """ Serializes a page of rows, see check_many
+        :param rows: sequence of mappings (e.g. aiopg RowProxy)
+        :return: list of dicts
+        """
+        if self.TRUSTED_OUTPUT:
+            serialize = self._trusted_serializer
+            try:
+                return [serialize(row) for row in rows]
+            except KeyError:  # row lacks a column, e.g. base_query selects a subset
+                pass
+        return self.check_many(rows)
+
+    def check_many(self, rows):
+        """ Serializes a page of rows using field trafarets compiled once.
+        Conversion goes column by column over the whole page; rows are read
+        by key, so result rows don't need to be copied into dicts first.
+        Key rules (optional, default, to_name) are applied as t.Dict does.
+        :param rows: sequence of mappings (e.g. aiopg RowProxy)
+        :return: list of dicts
+        """
+        page = [{} for _ in rows]
+        for key, trafaret in self._fields:
+            name, to_name = key.name, key.get_name()
+            check = trafaret.check
+            try:
+                try:
+                    for item, row in zip(page, rows):
+                        item[to_name] = check(row[name])
+                except KeyError:
+                    self.check_missing(key, check, page, rows)
+            except t.DataError as e:
+                raise t.DataError({name: e})
+        return page
+
+    def check_missing(self, key, check, page, rows):
+        """ Converts column some of the rows lack: missing value is taken
+        from key default, skipped for optional key or reported as required
+        """
+        name, to_name = key.name, key.get_name()
+        for item, row in zip(page, rows):
+            if name in row:
+                item[to_name] = check(row[name])
+            elif key.default is not _NO_DEFAULT:
+                item[to_name] = check(key.default() if callable(key.default) else key.default)
+            elif not key.optional:
+                raise t.DataError('is required')
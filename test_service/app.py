@@ -1,11 +1,32 @@
 import asyncio
 from aiohttp.web import Application
-from test_service import models, resources
+from rest_utils import codecs, compression, instrumentation, profiling
+from rest_utils.compression import compression_middleware
+from rest_utils.db import connection_middleware
+from rest_utils.instrumentation import metrics_middleware
+from rest_utils.permissions import TokenPermission
+from rest_utils.profiling import slow_request_middleware
+from test_service import models, resources, settings
 
 
 def build_application():
     loop = asyncio.get_event_loop()
-    app = Application(loop=loop)
+    app = Application(loop=loop, middlewares=[metrics_middleware,
+                                              slow_request_middleware,
+                                              compression_middleware,
+                                              connection_middleware])
+    codecs.setup(app, settings.JSON_CODEC)
+    codecs.setup_render_codecs(app, settings.RENDER_CODECS)
+    compression.setup(app, encodings=settings.COMPRESSION_ENCODINGS,
+                      min_size=settings.COMPRESSION_MIN_SIZE,
+                      offload_size=settings.COMPRESSION_OFFLOAD_SIZE)
+    if settings.METRICS_ENABLED:
+        instrumentation.setup(app, path=settings.METRICS_PATH)
+    if settings.PROFILING_ENABLED:
+        profiling.setup(app, threshold=settings.SLOW_REQUEST_THRESHOLD,
+                        size=settings.SLOW_REQUEST_LOG_SIZE,
+                        prefix=settings.PROFILING_PATH,
+                        permissions=[TokenPermission(settings.PROFILING_TOKEN)])
     loop.run_until_complete(models.setup(app))
     loop.run_until_complete(resources.setup(app))
     return app
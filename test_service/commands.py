@@ -0,0 +1,41 @@
+import logging
+from aio_manager import Command
+from rest_utils.server import serve
+from test_service import settings
+
+
+class Serve(Command):
+    """
+    Runs application in multiple worker processes sharing the port (SO_REUSEPORT)
+    """
+    def __init__(self, app, app_factory):
+        super().__init__('serve', app)
+        self.app_factory = app_factory
+
+    def run(self, app, args):
+        logging.getLogger().setLevel(args.level)
+        # every worker builds its own application, pools of this one
+        # must not be inherited by forked processes
+        app.loop.run_until_complete(app.finish())
+        serve(self.app_factory, host=args.hostname, port=args.port,
+              workers=args.workers, shutdown_timeout=args.shutdown_timeout,
+              uvloop=not args.no_uvloop)
+
+    def configure_parser(self, parser):
+        super().configure_parser(parser)
+        parser.add_argument('--hostname', metavar='HOST',
+                            help='host or ip to listen on')
+        parser.add_argument('--port', type=int, metavar='PORT',
+                            help='port to listen on')
+        parser.add_argument('--workers', type=int, metavar='N',
+                            help='number of worker processes, CPU count by default')
+        parser.add_argument('--shutdown-timeout', type=float, metavar='SECONDS',
+                            help='time in-flight requests are given on shutdown')
+        parser.add_argument('--no-uvloop', action='store_true',
+                            help="don't use uvloop even if installed")
+        parser.add_argument('--level', type=str, metavar='LEVEL',
+                            help='logging level')
+        parser.set_defaults(hostname=settings.SERVER_HOST, port=settings.SERVER_PORT,
+                            workers=settings.SERVER_WORKERS,
+                            shutdown_timeout=settings.SERVER_SHUTDOWN_TIMEOUT,
+                            no_uvloop=not settings.SERVER_UVLOOP, level='INFO')
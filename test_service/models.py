@@ -4,8 +4,11 @@ from sqlalchemy import Column, Integer, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 
 from aiopg.sa import create_engine
+from rest_utils.db import ConnectionPool, ReplicaSet
 from test_service.settings import DATABASE_HOST, DATABASE_PASSWORD,\
-    DATABASE_NAME, DATABASE_USERNAME
+    DATABASE_NAME, DATABASE_USERNAME, DATABASE_POOL_MINSIZE,\
+    DATABASE_POOL_MAXSIZE, DATABASE_POOL_TIMEOUT, DATABASE_REPLICAS,\
+    DATABASE_REPLICA_STRATEGY, DATABASE_STICKY_WINDOW
 
 
 metadata = AsyncMetaData()
@@ -24,7 +27,37 @@ def setup(app):
     engine = yield from create_engine(user=DATABASE_USERNAME,
                                       database=DATABASE_NAME,
                                       host=DATABASE_HOST,
-                                      password=DATABASE_PASSWORD)
-    app['db_engine'] = engine
+                                      password=DATABASE_PASSWORD,
+                                      minsize=DATABASE_POOL_MINSIZE,
+                                      maxsize=DATABASE_POOL_MAXSIZE,
+                                      timeout=DATABASE_POOL_TIMEOUT,
+                                      loop=app.loop)
+    app['db_engine'] = ConnectionPool(engine)
     app['db_declarative_base'] = Base
     metadata.bind = engine
+
+    if DATABASE_REPLICAS:
+        replicas = []
+        for replica in DATABASE_REPLICAS:
+            replica_engine = yield from create_engine(minsize=DATABASE_POOL_MINSIZE,
+                                                      maxsize=DATABASE_POOL_MAXSIZE,
+                                                      timeout=DATABASE_POOL_TIMEOUT,
+                                                      loop=app.loop,
+                                                      **replica)
+            replicas.append(ConnectionPool(replica_engine))
+        app['db_replicas'] = ReplicaSet(replicas,
+                                        strategy=DATABASE_REPLICA_STRATEGY,
+                                        sticky_window=DATABASE_STICKY_WINDOW)
+
+    app.register_on_finish(close)
+
+
+@asyncio.coroutine
+def close(app):
+    pools = [app['db_engine']]
+    if app.get('db_replicas') is not None:
+        pools.append(app['db_replicas'])
+    for pool in pools:
+        pool.close()
+    for pool in pools:
+        yield from pool.wait_closed()
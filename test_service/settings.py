@@ -2,3 +2,36 @@ DATABASE_HOST = '127.0.0.1'
 DATABASE_NAME = 'vaggadb'
 DATABASE_USERNAME = 'vaggauser'
 DATABASE_PASSWORD = 'password'
+DATABASE_POOL_MINSIZE = 1
+DATABASE_POOL_MAXSIZE = 10
+DATABASE_POOL_TIMEOUT = 60.0  # seconds
+
+# Read replicas for GET requests, e.g.
+# [{'host': '127.0.0.1', 'database': 'vaggadb_replica',
+#   'user': 'vaggauser', 'password': 'password'}]
+# `vagga initreplica` creates such database locally.
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_STRATEGY = 'round_robin'  # or 'least_busy'
+DATABASE_STICKY_WINDOW = 5.0  # seconds client reads from primary after write
+
+JSON_CODEC = None  # fastest available of orjson, ujson, rapidjson, json
+RENDER_CODECS = ['msgpack', 'cbor']  # negotiated by Accept/Content-Type if installed
+
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']  # server preference, skipped if not installed
+COMPRESSION_MIN_SIZE = 1024  # bytes, smaller responses are sent as is
+COMPRESSION_OFFLOAD_SIZE = 64 * 1024  # bytes, larger ones are compressed in thread pool
+
+METRICS_ENABLED = True  # per-route phase latency histograms, see rest_utils.instrumentation
+METRICS_PATH = '/metrics'  # Prometheus scrape endpoint
+
+PROFILING_ENABLED = False  # slow request capture and profiler, see rest_utils.profiling
+PROFILING_PATH = '/_debug'  # admin routes: /_debug/slow, /_debug/profile?seconds=10
+PROFILING_TOKEN = None  # required when enabled, sent in X-Debug-Token header
+SLOW_REQUEST_THRESHOLD = 0.5  # seconds
+SLOW_REQUEST_LOG_SIZE = 100  # last slow requests kept
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8080
+SERVER_WORKERS = None  # number of CPUs
+SERVER_SHUTDOWN_TIMEOUT = 10.0  # seconds in-flight requests are given on shutdown
+SERVER_UVLOOP = True  # use uvloop if installed
@@ -0,0 +1,50 @@
+import unittest
+from rest_utils.codecs import JSONCodec, parse_accept, negotiate, codec_for_content_type
+
+
+class MsgpackLikeCodec(JSONCodec):
+    name = 'msgpack'
+    media_type = 'application/msgpack'
+    aliases = ('application/x-msgpack',)
+
+
+class NegotiateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.json = JSONCodec()
+        self.msgpack = MsgpackLikeCodec()
+        self.codecs = [self.json, self.msgpack]
+
+    def test_parse_accept_orders_by_quality(self):
+        self.assertEqual(
+            parse_accept('text/html;q=0.5, application/msgpack, */*;q=0.1, image/png;q=0'),
+            ['application/msgpack', 'text/html', '*/*'])
+
+    def test_parse_accept_keeps_order_of_equal_quality(self):
+        self.assertEqual(parse_accept('b/b, a/a'), ['b/b', 'a/a'])
+
+    def test_parse_accept_malformed_quality_is_not_acceptable(self):
+        self.assertEqual(parse_accept('a/a;q=high, b/b'), ['b/b'])
+
+    def test_negotiate_defaults_to_first_codec(self):
+        self.assertIs(negotiate(None, self.codecs), self.json)
+        self.assertIs(negotiate('*/*', self.codecs), self.json)
+        self.assertIs(negotiate('text/html', self.codecs), self.json)
+
+    def test_negotiate_picks_by_media_type_and_alias(self):
+        self.assertIs(negotiate('application/msgpack', self.codecs), self.msgpack)
+        self.assertIs(negotiate('application/x-msgpack', self.codecs), self.msgpack)
+        self.assertIs(negotiate('application/json;q=0.5, application/msgpack',
+                                self.codecs), self.msgpack)
+
+    def test_negotiate_wildcard_subtype(self):
+        self.assertIs(negotiate('application/*', self.codecs), self.json)
+
+    def test_codec_for_content_type(self):
+        self.assertIs(codec_for_content_type('application/msgpack; charset=binary',
+                                             self.codecs), self.msgpack)
+        self.assertIs(codec_for_content_type(None, self.codecs), self.json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+from rest_utils.compression import parse_accept_encoding
+
+
+class AcceptEncodingTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.8, ZSTD;q=0, identity'),
+                         {'gzip': 1.0, 'br': 0.8, 'zstd': 0.0, 'identity': 1.0})
+
+    def test_malformed_quality(self):
+        self.assertEqual(parse_accept_encoding('gzip;q=x'), {'gzip': 0.0})
+
+    def test_empty(self):
+        self.assertEqual(parse_accept_encoding(''), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
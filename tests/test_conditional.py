@@ -0,0 +1,41 @@
+import unittest
+from rest_utils.conditional import compute_etag, encoded_etag, etag_matches, matching_etag
+
+
+class EtagMatchesTest(unittest.TestCase):
+    ETAG = '"abc"'
+
+    def test_compute_etag_is_strong(self):
+        etag = compute_etag(b'body')
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertEqual(etag, compute_etag(b'body'))
+        self.assertNotEqual(etag, compute_etag(b'other'))
+
+    def test_no_header(self):
+        self.assertFalse(etag_matches(None, self.ETAG))
+        self.assertFalse(etag_matches('', self.ETAG))
+
+    def test_list_and_star(self):
+        self.assertTrue(etag_matches('"x", "abc"', self.ETAG))
+        self.assertTrue(etag_matches('*', self.ETAG))
+        self.assertFalse(etag_matches('"x"', self.ETAG))
+
+    def test_weak_comparison(self):
+        self.assertTrue(etag_matches('W/"abc"', self.ETAG, weak=True))
+        self.assertFalse(etag_matches('W/"abc"', self.ETAG))
+
+    def test_encoded_variant(self):
+        self.assertEqual(encoded_etag(self.ETAG, 'gzip'), '"abc-gzip"')
+        self.assertEqual(encoded_etag('W/"abc"', 'br'), 'W/"abc-br"')
+        self.assertTrue(etag_matches('"abc-gzip"', self.ETAG))
+        self.assertTrue(etag_matches('W/"abc-br"', self.ETAG, weak=True))
+        self.assertFalse(etag_matches('"abcd-gzip"', self.ETAG))
+
+    def test_matching_etag_returns_matched_variant(self):
+        self.assertEqual(matching_etag('"x", W/"abc-gzip"', self.ETAG, weak=True),
+                         '"abc-gzip"')
+        self.assertIsNone(matching_etag('"x"', self.ETAG))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import datetime
+import json
+import unittest
+from aiohttp.web import Application
+from aiohttp.web_exceptions import HTTPBadRequest
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.declarative import declarative_base
+from rest_utils.resource import ModelResource
+
+Base = declarative_base()
+
+
+class Event(Base):
+    __tablename__ = 'event'
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(64))
+    starts_at = Column(DateTime)
+    public = Column(Boolean)
+
+
+class Engine:
+    dialect = postgresql.dialect()
+
+
+class EventResource(ModelResource):
+    model = Event
+
+    def get_path(self):
+        return '/events'
+
+
+def make_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode('ascii')
+
+
+class CursorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        app = Application(loop=self.loop)
+        app['db_engine'] = Engine()
+        self.resource = EventResource(app)
+        self.resource.register()
+        self.starts_at = datetime.datetime(2016, 1, 2, 3, 4, 5)
+        self.instance = {'id': 7, 'title': 'a', 'starts_at': self.starts_at, 'public': True}
+
+    def tearDown(self):
+        self.loop.close()
+
+    def roundtrip(self, order_by):
+        cursor = self.resource.encode_cursor(order_by, {}, self.instance)
+        columns = self.resource.get_cursor_columns(order_by)
+        return self.resource.decode_cursor(cursor, columns)
+
+    def test_lookup_key_only(self):
+        self.assertEqual(self.roundtrip(''), [7])
+        self.assertEqual(self.roundtrip('-id'), [7])
+
+    def test_order_column_comes_first(self):
+        self.assertEqual(self.roundtrip('title'), ['a', 7])
+
+    def test_datetime_is_restored(self):
+        self.assertEqual(self.roundtrip('-starts_at'), [self.starts_at, 7])
+
+    def test_serialized_item_values_are_preferred(self):
+        cursor = self.resource.encode_cursor('title', {'title': 'b'}, self.instance)
+        columns = self.resource.get_cursor_columns('title')
+        self.assertEqual(self.resource.decode_cursor(cursor, columns), ['b', 7])
+
+    def assert_malformed(self, cursor, order_by=''):
+        columns = self.resource.get_cursor_columns(order_by)
+        with self.assertRaises(HTTPBadRequest):
+            self.resource.decode_cursor(cursor, columns)
+
+    def test_malformed_encoding(self):
+        self.assert_malformed('!!!')
+        self.assert_malformed(base64.urlsafe_b64encode(b'not json').decode('ascii'))
+
+    def test_wrong_shape(self):
+        self.assert_malformed(make_cursor({'id': 1}))
+        self.assert_malformed(make_cursor([1, 2]))
+        self.assert_malformed(make_cursor([]), 'title')
+
+    def test_wrong_types(self):
+        self.assert_malformed(make_cursor(['x']))
+        self.assert_malformed(make_cursor([True]))
+        self.assert_malformed(make_cursor(['yesterday', 1]), 'starts_at')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from rest_utils.db import RequestConnection
+
+
+class Pool:
+    def __init__(self, loop):
+        self.loop = loop
+        self.acquired = 0
+        self.released = []
+
+    @asyncio.coroutine
+    def acquire(self):
+        yield from asyncio.sleep(0, loop=self.loop)  # switch to other coroutines
+        self.acquired += 1
+        return 'conn{}'.format(self.acquired)
+
+    def release(self, conn):
+        self.released.append(conn)
+
+
+class RequestConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.pool = Pool(self.loop)
+        self.shared = RequestConnection(self.pool)
+
+    def tearDown(self):
+        self.loop.close()
+
+    @asyncio.coroutine
+    def use(self, hold=0):
+        with (yield from self.shared) as conn:
+            yield from asyncio.sleep(hold, loop=self.loop)
+            return conn
+
+    def run_until_complete(self, *coros):
+        return self.loop.run_until_complete(asyncio.gather(*coros, loop=self.loop))
+
+    def test_sequential_uses_share_connection(self):
+        self.assertEqual(self.run_until_complete(self.use()), ['conn1'])
+        self.assertEqual(self.run_until_complete(self.use()), ['conn1'])
+        self.shared.release()
+        self.assertEqual(self.pool.released, ['conn1'])
+
+    def test_concurrent_first_uses_do_not_leak(self):
+        conns = self.run_until_complete(self.use(0.01), self.use(0.01))
+        self.assertEqual(sorted(conns), ['conn1', 'conn2'])
+        self.shared.release()
+        self.assertEqual(sorted(self.pool.released), ['conn1', 'conn2'])
+
+    def test_busy_connection_is_not_shared(self):
+        @asyncio.coroutine
+        def nested():
+            with (yield from self.shared) as outer:
+                with (yield from self.shared) as inner:
+                    return outer, inner
+
+        (outer, inner), = self.run_until_complete(nested())
+        self.assertNotEqual(outer, inner)
+        self.assertEqual(self.pool.released, [inner])
+        self.assertEqual(self.run_until_complete(self.use()), [outer])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import trafaret as t
+from aiohttp.multidict import MultiDict
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, UniqueConstraint
+from rest_utils.filters import FilterSet, indexed_columns
+
+
+class FilterSetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = Table('item', MetaData(),
+                           Column('id', Integer, primary_key=True),
+                           Column('text', String(32)))
+        self.filterset = FilterSet(self.table, {'id': ['exact', 'in', 'isnull'],
+                                                'text': ['startswith']})
+
+    def test_parse(self):
+        params = MultiDict([('id', '3'), ('id__in', '1,2'), ('text__startswith', 'a%'),
+                            ('id__isnull', 'false'), ('count', '10')])
+        self.assertEqual(self.filterset.parse(params, ignore=('count',)),
+                         [('id', 'exact', 3), ('id', 'in', [1, 2]),
+                          ('text', 'startswith', 'a%'), ('id', 'isnull', False)])
+
+    def test_parse_collects_errors(self):
+        params = MultiDict([('id', 'x'), ('id__in', ''), ('text', 'a'), ('id__lt', '1')])
+        with self.assertRaises(t.DataError) as context:
+            self.filterset.parse(params)
+        self.assertEqual(sorted(context.exception.as_dict()), ['id', 'id__in', 'id__lt', 'text'])
+
+    def test_apply_escapes_like(self):
+        query = self.filterset.apply(self.table.select(), [('text', 'startswith', 'a_%')])
+        self.assertEqual(query.compile().params['text_1'], 'a\\_\\%%')
+
+    def test_unknown_declarations(self):
+        with self.assertRaises(Exception):
+            FilterSet(self.table, {'missing': ['exact']})
+        with self.assertRaises(Exception):
+            FilterSet(self.table, {'id': ['like']})
+        with self.assertRaises(Exception):
+            FilterSet(self.table, {'id': ['contains']})
+
+
+
+class IndexedColumnsTest(unittest.TestCase):
+
+    def test_leading_columns(self):
+        table = Table('pair', MetaData(),
+                      Column('id', Integer, primary_key=True),
+                      Column('a', Integer), Column('b', Integer),
+                      Column('c', Integer, index=True), Column('d', Integer),
+                      UniqueConstraint('a', 'b'))
+        Index('ix_pair_d_b', table.c.d, table.c.b)
+        self.assertEqual(indexed_columns(table), {'id', 'a', 'c', 'd'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from rest_utils.loader import DataLoader
+
+
+class DataLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.batches = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    @asyncio.coroutine
+    def batch_load(self, keys):
+        self.batches.append(sorted(keys))  # gather may schedule loads in any order
+        return {key: key * 10 for key in keys if key != 0}
+
+    def gather(self, loader, keys):
+        return self.loop.run_until_complete(asyncio.gather(
+            *[loader.load(key) for key in keys], loop=self.loop))
+
+    def test_batches_loads_of_one_tick(self):
+        loader = DataLoader(self.batch_load, loop=self.loop)
+        self.assertEqual(self.gather(loader, [1, 2, 3]), [10, 20, 30])
+        self.assertEqual(self.batches, [[1, 2, 3]])
+
+    def test_deduplicates_keys(self):
+        loader = DataLoader(self.batch_load, loop=self.loop)
+        self.assertEqual(self.gather(loader, [1, 2, 1, 1]), [10, 20, 10, 10])
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertEqual(loader.stats()['coalesced'], 2)
+
+    def test_missing_key_resolves_to_none(self):
+        loader = DataLoader(self.batch_load, loop=self.loop)
+        self.assertEqual(self.gather(loader, [0, 1]), [None, 10])
+
+    def test_max_batch_size(self):
+        loader = DataLoader(self.batch_load, loop=self.loop, max_batch_size=2)
+        self.assertEqual(self.gather(loader, [1, 2, 3]), [10, 20, 30])
+        self.assertEqual(sorted(len(keys) for keys in self.batches), [1, 2])
+
+    def test_values_are_not_cached_between_batches(self):
+        loader = DataLoader(self.batch_load, loop=self.loop)
+        self.gather(loader, [1])
+        self.gather(loader, [1])
+        self.assertEqual(self.batches, [[1], [1]])
+        self.assertEqual(loader.stats()['in_flight'], 0)
+
+    def test_error_propagates_to_every_caller(self):
+        @asyncio.coroutine
+        def failing_load(keys):
+            self.batches.append(keys)
+            raise ValueError('database is down')
+
+        loader = DataLoader(failing_load, loop=self.loop)
+        results = self.loop.run_until_complete(asyncio.gather(
+            loader.load(1), loader.load(1), loader.load(2),
+            loop=self.loop, return_exceptions=True))
+        self.assertEqual(len(self.batches), 1)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+        # failed keys are detached, next load queries again
+        loader.batch_load = self.batch_load
+        self.assertEqual(self.gather(loader, [1]), [10])
+
+    def test_cancelled_caller_does_not_cancel_shared_load(self):
+        loader = DataLoader(self.batch_load, loop=self.loop)
+        first = asyncio.ensure_future(loader.load(1), loop=self.loop)
+        second = asyncio.ensure_future(loader.load(1), loop=self.loop)
+        self.loop.call_soon(first.cancel)
+        self.loop.run_until_complete(asyncio.wait([first, second], loop=self.loop))
+        self.assertTrue(first.cancelled())
+        self.assertEqual(second.result(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import datetime
+import unittest
+import trafaret as t
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+from rest_utils.validator import ModelSerializer
+
+Base = declarative_base()
+
+
+class Note(Base):
+    __tablename__ = 'note'
+
+    id = Column(Integer, primary_key=True)
+    text = Column(String(32))
+    created = Column(DateTime, nullable=False)
+
+
+CREATED = datetime.datetime(2016, 1, 2, 3, 4, 5)
+
+
+class RenamingSerializer(ModelSerializer):
+    def key_kwargs_text(self, column, kwargs):
+        return dict(kwargs, to_name='body', default='')
+
+
+class SerializeManyTest(unittest.TestCase):
+    serializer_class = ModelSerializer
+    renaming_serializer_class = RenamingSerializer
+
+    def serializer(self, **kwargs):
+        return self.serializer_class(Note, **kwargs)
+
+    def test_page(self):
+        rows = [{'id': 1, 'text': 'a', 'created': CREATED},
+                {'id': 2, 'text': None, 'created': CREATED}]
+        self.assertEqual(self.serializer().serialize_many(rows), [
+            {'id': 1, 'text': 'a', 'created': '2016-01-02T03:04:05'},
+            {'id': 2, 'text': None, 'created': '2016-01-02T03:04:05'}])
+
+    def test_matches_single_row_serialization(self):
+        row = {'id': 1, 'text': 'a', 'created': CREATED}
+        self.assertEqual(self.serializer().serialize_many([row]),
+                         [self.serializer().serialize(row)])
+
+    def test_empty_page(self):
+        self.assertEqual(self.serializer().serialize_many([]), [])
+
+    def test_fieldset(self):
+        rows = [{'id': 1, 'text': 'a', 'created': CREATED}]
+        self.assertEqual(self.serializer(fields=('id',)).serialize_many(rows), [{'id': 1}])
+
+    def test_native_datetime(self):
+        rows = [{'id': 1, 'text': 'a', 'created': CREATED}]
+        self.assertEqual(self.serializer(native=True).serialize_many(rows)[0]['created'],
+                         CREATED)
+
+    def test_missing_optional_column_is_omitted(self):
+        rows = [{'id': 1, 'text': 'a', 'created': CREATED}, {'id': 2, 'created': CREATED}]
+        page = self.serializer().serialize_many(rows)
+        self.assertEqual(page[1], {'id': 2, 'created': '2016-01-02T03:04:05'})
+        self.assertEqual(self.serializer().serialize({'id': 1, 'created': CREATED}),
+                         {'id': 1, 'created': '2016-01-02T03:04:05'})
+
+    def test_missing_required_column(self):
+        with self.assertRaises(t.DataError) as context:
+            self.serializer().serialize_many([{'id': 1}])
+        self.assertEqual(context.exception.as_dict(), {'created': 'is required'})
+
+    def test_key_rules(self):
+        serializer = self.renaming_serializer_class(Note)
+        self.assertEqual(serializer.serialize_many([{'id': 1, 'text': 'a', 'created': CREATED},
+                                                    {'id': 2, 'created': CREATED}]),
+                         [{'id': 1, 'body': 'a', 'created': '2016-01-02T03:04:05'},
+                          {'id': 2, 'body': '', 'created': '2016-01-02T03:04:05'}])
+
+    def test_invalid_value(self):
+        with self.assertRaises(t.DataError) as context:
+            self.serializer().serialize_many([{'id': 'x', 'text': None, 'created': CREATED}])
+        self.assertIn('id', context.exception.as_dict())
+
+
+class TrustedSerializer(ModelSerializer):
+    TRUSTED_OUTPUT = True
+
+
+class TrustedRenamingSerializer(RenamingSerializer):
+    TRUSTED_OUTPUT = True
+
+
+class TrustedSerializeManyTest(SerializeManyTest):
+    """ Generated serializer gives the same output as trafaret one
+    """
+    serializer_class = TrustedSerializer
+    renaming_serializer_class = TrustedRenamingSerializer
+
+    def test_custom_cut_goes_through_trafaret(self):
+        class UpperSerializer(TrustedSerializer):
+            def cut_text(self, trafaret, column):
+                return trafaret >> (lambda value: value and value.upper())
+
+        self.assertEqual(UpperSerializer(Note).serialize({'id': 1, 'text': 'a',
+                                                          'created': CREATED})['text'], 'A')
+
+    def test_invalid_value(self):
+        # database values are trusted and passed as is
+        self.assertEqual(self.serializer().serialize({'id': 'x', 'text': None,
+                                                      'created': CREATED})['id'], 'x')
+
+    def test_generated_once(self):
+        serializer = self.serializer()
+        self.assertIs(serializer._trusted_serializer, self.serializer()._trusted_serializer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import uuid
+import trafaret as t
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.declarative import declarative_base
+from rest_utils.instrumentation import write_stats_family
+from rest_utils.validator import ModelValidator, ModelSerializer, TrafaretRegistry, \
+    registry, check_column_value
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = 'item'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(32), nullable=False)
+
+
+class Token(Base):
+    __tablename__ = 'token'
+
+    id = Column(UUID, primary_key=True, server_default=text('uuid_generate_v4()'))
+    name = Column(String(32), nullable=False)
+
+
+class Membership(Base):
+    __tablename__ = 'membership'
+
+    item_id = Column(Integer, ForeignKey('item.id'), primary_key=True)
+    role = Column(Integer, primary_key=True)
+
+
+class TrafaretRegistryTest(unittest.TestCase):
+
+    def test_builds_once(self):
+        registry = TrafaretRegistry()
+        calls = []
+        for _ in range(3):
+            registry.get('key', lambda: calls.append(1) or len(calls))
+        self.assertEqual(calls, [1])
+        self.assertEqual(registry.stats(), {'compiled': 1, 'hits': 2, 'evictions': 0, 'size': 1})
+
+    def test_evicts_least_recently_used(self):
+        registry = TrafaretRegistry(max_size=2)
+        for key in ('a', 'b', 'a', 'c'):
+            registry.get(key, lambda: key)
+        registry.get('b', lambda: 'rebuilt')
+        self.assertEqual(registry.stats()['evictions'], 2)
+        self.assertEqual(registry.get('a', lambda: 'rebuilt a'), 'rebuilt a')
+
+    def test_invalidate_by_model(self):
+        registry = TrafaretRegistry()
+        registry.get((ModelValidator, Item, None, 'dict'), lambda: 1)
+        registry.get((ModelValidator, object, None, 'dict'), lambda: 2)
+        registry.invalidate(model=Item)
+        self.assertEqual(registry.stats()['size'], 1)
+
+    def test_validator_reuses_compiled_trafaret(self):
+        ModelValidator(Item).invalidate()
+        compiled = registry.compiled
+        self.assertEqual(ModelValidator(Item).check({'name': 'a'}), {'name': 'a'})
+        self.assertEqual(ModelValidator(Item).check({'name': 'b'}), {'name': 'b'})
+        self.assertEqual(registry.compiled - compiled, 2)  # fields and dict trafarets
+
+
+class PrimaryKeyTest(unittest.TestCase):
+
+    def test_serial_key_is_skipped(self):
+        self.assertEqual(ModelValidator(Item).check({'name': 'a'}), {'name': 'a'})
+
+    def test_key_with_server_default_is_skipped(self):
+        self.assertEqual(ModelValidator(Token).check({'name': 'x'}), {'name': 'x'})
+
+    def test_composite_key_is_required(self):
+        with self.assertRaises(t.DataError) as context:
+            ModelValidator(Membership).check({'item_id': 1})
+        self.assertEqual(context.exception.as_dict(), {'role': 'is required'})
+
+    def test_uuid_key_is_serialized(self):
+        ident = uuid.uuid4()
+        self.assertEqual(ModelSerializer(Token).serialize({'id': ident, 'name': 'x'}),
+                         {'id': str(ident), 'name': 'x'})
+
+
+class CheckColumnValueTest(unittest.TestCase):
+
+    def test_bool_is_not_int(self):
+        with self.assertRaises(t.DataError):
+            check_column_value(Item.__table__.c.id, t.Int(), True)
+        self.assertEqual(check_column_value(Item.__table__.c.id, t.Int(), 1), 1)
+
+    def test_bool_column(self):
+        column = Column('flag', Boolean)
+        self.assertIs(check_column_value(column, t.Bool(), False), False)
+
+
+class StatsMetricsTest(unittest.TestCase):
+
+    def test_counters_and_size_gauge(self):
+        lines = []
+        write_stats_family(lines, 'cache', 'Cache', [({'name': 'a'}, {'hits': 3, 'size': 1}),
+                                                     ({'name': 'b'}, {'hits': 4})])
+        self.assertIn('# TYPE cache_hits_total counter', lines)
+        self.assertIn('cache_hits_total{name="b"} 4', lines)
+        self.assertIn('# TYPE cache_size gauge', lines)
+        self.assertIn('cache_size{name="a"} 1', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()